@@ -34,6 +34,229 @@
 #
 #*****************************************************************************
 
+from collections import OrderedDict, deque
+import bisect
+import os
+import threading
+import traceback
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from vitaToolbox.loggingUtils.LoggingUtils import kLogLevelError
+from vitaToolbox.loggingUtils.LoggingUtils import getStderrLogCB
+
+
+# Durations and ms lists of recently opened files, shared by all ClipReader
+# instances.  Keyed by (path, mtime, size), so a file that is still being
+# written to (or gets replaced) is simply looked up under a new key...
+_kFileInfoCacheSize = 64
+_fileInfoCacheLock = threading.Lock()
+_durationCache = OrderedDict()
+_msListCache = OrderedDict()
+
+# If prevMs is within this many ms of where the sequential reader is, we
+# consider the reader to already be in the right place and won't seek...
+_kSeekToleranceMs = 1
+
+# How many frames the prefetch thread is allowed to get ahead of the client,
+# unless the 'readAhead' extra says otherwise...
+_kPrefetchDepth = 4
+
+
+##############################################################################
+def _getFileInfoKey(path):
+    """Return the key to use for the file info caches.
+
+    @param  path  The path of the clip.
+    @return key   A (path, mtime, size) tuple; None if the file can't be stat'd.
+    """
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return (path, st.st_mtime, st.st_size)
+
+
+##############################################################################
+def _getCachedFileInfo(cache, key):
+    """Look up a value in one of the file info caches.
+
+    @param  cache  The cache to look in.
+    @param  key    The key from _getFileInfoKey(); may be None.
+    @return value  The cached value, or None if there isn't one.
+    """
+    if key is None:
+        return None
+
+    with _fileInfoCacheLock:
+        value = cache.pop(key, None)
+        if value is not None:
+            # Re-insert, so the entry becomes the most recently used one...
+            cache[key] = value
+    return value
+
+
+##############################################################################
+def _setCachedFileInfo(cache, key, value):
+    """Store a value in one of the file info caches, evicting the least
+    recently used entries as needed.
+
+    @param  cache  The cache to store to.
+    @param  key    The key from _getFileInfoKey(); may be None.
+    @param  value  The value to store.
+    """
+    if key is None:
+        return
+
+    with _fileInfoCacheLock:
+        cache[key] = value
+        while len(cache) > _kFileInfoCacheSize:
+            cache.popitem(last=False)
+
+
+##############################################################################
+class _FramePrefetcher(object):
+    """Reads frames from a reader on a background thread.
+
+    The thread only reads while we're "active" (see resume() and pause()), so
+    that the owner can safely use the reader for other things in between.
+    """
+    ###########################################################
+    def __init__(self, reader, lock, depth=_kPrefetchDepth, logFn=None):
+        """_FramePrefetcher constructor.
+
+        @param  reader  The reader to call getNextFrame() on.
+        @param  lock    A lock that guards all access to the reader.
+        @param  depth   How many frames we may read ahead of get().
+        @param  logFn   Function for logging read failures.
+        """
+        if logFn is None:
+            logFn = getStderrLogCB()
+        self._logFn = logFn
+        self._reader = reader
+        self._cond = threading.Condition(lock)
+        self._queue = queue.Queue(depth)
+
+        # Bumped whenever we pause or resume; frames read under an older
+        # generation are stale and get thrown away by get()...
+        self._generation = 0
+        self._active = False
+        self._atEnd = False
+        self._stopped = False
+
+        # The ms of the last frame the thread read since resume(), or None...
+        self._lastMs = None
+
+        thread = threading.Thread(target=self._run, name="ClipPrefetch")
+        thread.daemon = True
+        thread.start()
+
+
+    ###########################################################
+    def _run(self):
+        """The body of the prefetch thread."""
+        while True:
+            with self._cond:
+                while (not self._active or self._atEnd) and \
+                      not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+
+                generation = self._generation
+                try:
+                    clipFrame = self._reader.getNextFrame()
+                except Exception:
+                    # Treat it as the end of the clip, so get() still wakes...
+                    self._logFn(kLogLevelError, "Prefetching a frame failed: "
+                                "%s" % traceback.format_exc())
+                    clipFrame = None
+                if clipFrame is None:
+                    self._lastMs = -1
+                    self._atEnd = True
+                else:
+                    self._lastMs = clipFrame.ms
+
+            # Blocks once we're far enough ahead of the client...
+            self._queue.put((generation, clipFrame))
+
+
+    ###########################################################
+    def _drain(self):
+        """Throw away anything in the queue."""
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+    ###########################################################
+    def isActive(self):
+        """Return whether the thread is currently reading ahead.
+
+        @return isActive  True if resume() was called and we haven't paused
+                          (or given out the end of the clip) since.
+        """
+        return self._active
+
+
+    ###########################################################
+    def resume(self):
+        """Start reading ahead from the reader's current position."""
+        with self._cond:
+            self._generation += 1
+            self._active = True
+            self._atEnd = False
+            self._lastMs = None
+            self._cond.notify()
+
+
+    ###########################################################
+    def pause(self):
+        """Stop reading ahead and throw away anything we've read.
+
+        @return lastMs  The ms of the last frame the reader returned since
+                        resume() (-1 if it hit the end), or None if it didn't
+                        read anything.
+        """
+        with self._cond:
+            self._generation += 1
+            self._active = False
+            lastMs = self._lastMs
+            self._drain()
+        return lastMs
+
+
+    ###########################################################
+    def stop(self):
+        """Make the thread exit."""
+        with self._cond:
+            self._stopped = True
+            self._active = False
+            self._cond.notify()
+            self._drain()
+
+
+    ###########################################################
+    def get(self):
+        """Return the next prefetched frame; only call when active.
+
+        @return frame  The next frame, or None at the end of the clip.
+        """
+        while True:
+            generation, clipFrame = self._queue.get()
+            if generation != self._generation:
+                continue
+
+            if clipFrame is None:
+                with self._cond:
+                    self._active = False
+            return clipFrame
+
 
 ##############################################################################
 class ClipReader(object):
@@ -46,14 +269,41 @@ class ClipReader(object):
     - Convenience functions for the client.
     """
 
+    # The reader class we delegate to.  FfMpegClipReader imports ClipFrame
+    # from us, so it can't be imported at module level; we resolve it on first
+    # use and keep it around...
+    _readerClass = None
+
     ###########################################################
-    def __init__(self, logFn=None):
+    def __init__(self, logFn=None, singleReaderMode=True, enablePrefetch=False,
+                 backBufferSize=0):
         """ClipReader constructor.
 
-        @param  logFn       Function for logging; should be suitable for
-                            passing to ctypes.
+        @param  logFn             Function for logging; should be suitable for
+                                  passing to ctypes.
+        @param  singleReaderMode  If True, random and sequential access share
+                                  one reader (and one decoder); we'll seek the
+                                  sequential position back after random
+                                  access.  If False, we'll open a separate
+                                  reader for each.
+        @param  enablePrefetch    If True, getNextFrame() will be fed by a
+                                  thread that decodes a few frames ahead.
+                                  Clips opened with the 'asyncRead' extra
+                                  always get this.
+        @param  backBufferSize    How many of the most recent sequentially
+                                  read frames to hang on to, so getPrevFrame()
+                                  can step back without seeking; 0 disables.
+                                  Each one holds a whole decoded frame (about
+                                  6MB at 1080p), so this is opt-in.
         """
         self._logFn = logFn
+        self._singleReaderMode = singleReaderMode
+        self._enablePrefetch = enablePrefetch
+        self._backBufferSize = backBufferSize
+
+        # Guards the sequential reader whenever the prefetch thread may be
+        # using it...
+        self._readerLock = threading.Lock()
         self._reset()
 
 
@@ -70,12 +320,19 @@ class ClipReader(object):
         # isn't required (their descructors should be called when we lose
         # references to them), but it's safer.
         if forClose:
-            for rdr in (self._firstReader, self._randReader, self._seqReader):
-                if rdr is not None:
-                    rdr.close()
-
-        # We open a different reader for sequential vs. random access.  This
-        # makes it efficient to effectively have two file pointers...
+            if self._prefetcher is not None:
+                self._prefetcher.stop()
+            for rdr in self._allReaders:
+                rdr.close()
+
+        # Feeds getNextFrame() when prefetch is enabled; created on demand...
+        self._prefetcher = None
+        self._usePrefetch = self._enablePrefetch
+        self._prefetchDepth = _kPrefetchDepth
+
+        # Unless we're in single reader mode, we open a different reader for
+        # sequential vs. random access.  This makes it efficient to effectively
+        # have two file pointers...
         # ...we'll open them on-demand...
         self._seqReader = None
         self._randReader = None
@@ -85,6 +342,12 @@ class ClipReader(object):
         # temporarily store the clipReader here...
         self._firstReader = None
 
+        # Every reader we've allocated, no matter which role it plays.  Kept
+        # up to date by _allocReader() so that accessors which don't care
+        # about the role don't need to scan the slots above...
+        self._allReaders = []
+        self._anyReader = None
+
         # Semi public (read-only) variables...
 
         # ...the parameters that were passed to open...
@@ -106,6 +369,15 @@ class ClipReader(object):
         # ...set to True once getNextFrame() hits the end
         self.isDone = False
 
+        # ...the most recent frames returned by getNextFrame(), getPrevFrame()
+        # and seek(), oldest first.  These are always consecutive frames of
+        # the clip, so we can step around within them without the reader...
+        self._backBuffer = deque(maxlen=self._backBufferSize)
+
+        # ...set to True when random access moved the shared reader before
+        # any sequential reads happened (single reader mode only)
+        self._needsRewind = False
+
         # Cached values
         self._duration = None
         self._msList = None
@@ -136,6 +408,11 @@ class ClipReader(object):
         self.firstMs = firstMs
         self.extras = extras
 
+        if extras and extras.get('asyncRead', 0):
+            self._usePrefetch = True
+            self._prefetchDepth = max(1, extras.get('readAhead',
+                                                    _kPrefetchDepth))
+
         self._firstReader = self._allocReader()
 
         return self._firstReader is not None
@@ -148,9 +425,8 @@ class ClipReader(object):
 
     ###########################################################
     def hasAudio(self):
-        for rdr in (self._firstReader, self._randReader, self._seqReader):
-            if rdr is not None:
-                return rdr.hasAudio()
+        if self._anyReader is not None:
+            return self._anyReader.hasAudio()
         return False
 
     ###########################################################
@@ -176,11 +452,18 @@ class ClipReader(object):
 
         @return reader  A newly created reader; None upon error.
         """
-        from FfMpegClipReader import FfMpegClipReader
-        reader = FfMpegClipReader(self._logFn)
+        if ClipReader._readerClass is None:
+            from FfMpegClipReader import FfMpegClipReader
+            ClipReader._readerClass = FfMpegClipReader
+
+        reader = ClipReader._readerClass(self._logFn)
         success = reader.open( self.path, self.width, self.height, self.firstMs, self.extras )
         if not success:
-            reader = None
+            return None
+
+        self._allReaders.append(reader)
+        if self._anyReader is None:
+            self._anyReader = reader
 
         return reader
 
@@ -194,11 +477,7 @@ class ClipReader(object):
 
         @return reader  One of our readers.
         """
-        for rdr in (self._firstReader, self._randReader, self._seqReader):
-            if rdr is not None:
-                return rdr
-
-        return None
+        return self._anyReader
 
 
     ###########################################################
@@ -229,6 +508,9 @@ class ClipReader(object):
 
         @return reader  The random reader.
         """
+        if self._singleReaderMode:
+            return self._getSeqReader()
+
         if self._randReader is None:
             if self._firstReader is not None:
                 # First becomes random...
@@ -252,7 +534,14 @@ class ClipReader(object):
             if reader is None:
                 return -1
 
-            self._duration = reader.getDuration()
+            key = _getFileInfoKey(self.path)
+            duration = _getCachedFileInfo(_durationCache, key)
+            if duration is None:
+                duration = reader.getDuration()
+                if duration >= 0:
+                    _setCachedFileInfo(_durationCache, key, duration)
+
+            self._duration = duration
 
         return self._duration
 
@@ -261,17 +550,139 @@ class ClipReader(object):
     def getMsList(self):
         """Get the ms offset of each frame in the clip
 
-        @return msList  A list of offsets of each frame in the clip
+        @return msList  A sequence of offsets of each frame in the clip
         """
-        if not self._msList:
-            # Need to use random reader, since this will mess up the location...
-            reader = self._getRandReader()
+        # Note: an empty list is a legitimate (cached) answer for a clip
+        # without any frames; we don't want to rescan those each time...
+        if self._msList is None:
+            key = _getFileInfoKey(self.path)
+            msList = _getCachedFileInfo(_msListCache, key)
+            if msList is None:
+                # Need to use random reader, since this will mess up the
+                # location...
+                reader = self._getRandReader()
+                if reader is None:
+                    return ()
+
+                # Stored as a tuple, since it's shared between readers...
+                msList = tuple(reader.getMsList())
+                _setCachedFileInfo(_msListCache, key, msList)
+
+            self._msList = msList
+
+        return self._msList
+
+
+    ###########################################################
+    def _syncSeqReader(self, canReadAhead):
+        """Make sure the sequential reader is positioned at self.prevMs.
+
+        Seeking flushes the decoder and re-decodes from the previous keyframe,
+        so we try hard to avoid it when the reader is already (about) where
+        the client wants it to be.
+
+        @param  canReadAhead  If True and prevMs is known to be the frame
+                              right after the one the reader last returned,
+                              we'll just read that frame rather than seek.
+        """
+        if self.prevMs < 0:
+            return
+        if self._readerPrevMs >= 0 and \
+           abs(self._readerPrevMs - self.prevMs) <= _kSeekToleranceMs:
+            return
+
+        if canReadAhead and self._readerPrevMs >= 0 and self._msList:
+            index = bisect.bisect_right(self._msList, self._readerPrevMs)
+            if index < len(self._msList) and \
+               self._msList[index] == self.prevMs:
+                reader = self._getSeqReader()
+                if reader is not None:
+                    clipFrame = reader.getNextFrame()
+                    if clipFrame is not None and clipFrame.ms == self.prevMs:
+                        self._readerPrevMs = clipFrame.ms
+                        return
+
+        # We're off in the weeds--just use seek...
+        self.seek(self.prevMs)
+
+
+    ###########################################################
+    def _rewindSeqReader(self):
+        """Put the shared reader back at the first frame of the clip.
+
+        Only needed in single reader mode, when getFrameAt() moved the reader
+        before the client did any sequential reads.
+
+        @return frame  A ClipFrame of the first frame; None if we weren't
+                       asked to rewind (or couldn't).
+        """
+        if not self._needsRewind:
+            return None
+        self._needsRewind = False
+
+        msList = self.getMsList()
+        if not msList:
+            return None
+        return self.seek(msList[0])
+
+
+    ###########################################################
+    def _pausePrefetch(self):
+        """Stop the prefetch thread so we can use the sequential reader.
+
+        Frames the thread already read are thrown away, so we note where that
+        left the reader; the next getNextFrame() will seek back if needed.
+        """
+        if self._prefetcher is None or not self._prefetcher.isActive():
+            return
+
+        lastMs = self._prefetcher.pause()
+        if lastMs is not None:
+            self._readerPrevMs = lastMs
+
+
+    ###########################################################
+    def _getPrefetchedFrame(self):
+        """Get the next frame from the prefetch thread, starting it if needed.
+
+        @return frame  A ClipFrame of the next frame in the clip or None on
+                       error or when all frames have been read
+        """
+        if self._prefetcher is None:
+            reader = self._getSeqReader()
             if reader is None:
-                return []
+                return None
+            self._prefetcher = _FramePrefetcher(reader, self._readerLock,
+                                                self._prefetchDepth,
+                                                self._logFn)
 
-            self._msList = reader.getMsList()
+        if not self._prefetcher.isActive():
+            self._syncSeqReader(True)
+            self._prefetcher.resume()
 
-        return self._msList
+        return self._prefetcher.get()
+
+
+    ###########################################################
+    def _getBufferedFrame(self, step):
+        """Look for a frame next to prevMs in the back buffer.
+
+        @param  step   1 for the frame after prevMs; -1 for the one before.
+        @return frame  The buffered ClipFrame, or None if we don't have it.
+        """
+        backBuffer = self._backBuffer
+        if self.prevMs < 0 or not backBuffer:
+            return None
+
+        # Usually we're right at the newest frame, so search from the end...
+        for i in range(len(backBuffer)-1, -1, -1):
+            if backBuffer[i].ms == self.prevMs:
+                i += step
+                if 0 <= i < len(backBuffer) and \
+                   not backBuffer[i].released:
+                    return backBuffer[i]
+                return None
+        return None
 
 
     ###########################################################
@@ -281,15 +692,31 @@ class ClipReader(object):
         @return frame  A ClipFrame of the next frame in the clip or None on
                        error or when all frames have been read
         """
-        if self._readerPrevMs != self.prevMs:
-            # We're off in the weeds--just use seek...
-            self.seek(self.prevMs)
-
-        reader = self._getSeqReader()
-        if reader is None:
+        clipFrame = self._getBufferedFrame(1)
+        if clipFrame is not None:
+            self.prevMs = clipFrame.ms
+            return clipFrame
+
+        # Once we've hit the end, stay there; random access may have moved
+        # the shared reader since, but that's no reason to start over...
+        if self.isDone and self.prevMs < 0:
             return None
 
-        clipFrame = reader.getNextFrame()
+        clipFrame = self._rewindSeqReader()
+        if clipFrame is not None:
+            return clipFrame
+
+        if self._usePrefetch:
+            clipFrame = self._getPrefetchedFrame()
+        else:
+            self._syncSeqReader(True)
+
+            reader = self._getSeqReader()
+            if reader is None:
+                return None
+
+            clipFrame = reader.getNextFrame()
+
         if clipFrame is None:
             self._readerPrevMs = -1
             self.prevMs = -1
@@ -297,6 +724,10 @@ class ClipReader(object):
             return None
         self._readerPrevMs = clipFrame.ms
 
+        if self._backBuffer and self._backBuffer[-1].ms != self.prevMs:
+            self._backBuffer.clear()
+        self._backBuffer.append(clipFrame)
+
         self.prevMs = clipFrame.ms
 
         return clipFrame
@@ -309,8 +740,19 @@ class ClipReader(object):
         @return frame  A ClipFrame of the previous frame in the clip or None on
                        error or when all frames have been read
         """
-        if self._readerPrevMs != self.prevMs:
-            self.seek(self.prevMs)
+        clipFrame = self._getBufferedFrame(-1)
+        if clipFrame is not None:
+            self.isDone = False
+            self.prevMs = clipFrame.ms
+            return clipFrame
+
+        self._pausePrefetch()
+
+        clipFrame = self._rewindSeqReader()
+        if clipFrame is not None:
+            return clipFrame
+
+        self._syncSeqReader(False)
 
         reader = self._getSeqReader()
         if reader is None:
@@ -323,6 +765,13 @@ class ClipReader(object):
             return None
         self._readerPrevMs = clipFrame.ms
 
+        # Extend the back buffer backwards if we can (which drops its newest
+        # frame once it's full)...
+        if self._backBuffer and self._backBuffer[0].ms != self.prevMs:
+            self._backBuffer.clear()
+        if self._backBufferSize:
+            self._backBuffer.appendleft(clipFrame)
+
         self.isDone = False
         self.prevMs = clipFrame.ms
 
@@ -335,6 +784,23 @@ class ClipReader(object):
 
         @return ms  The ms offset of the next frame, or -1 if no more.
         """
+        if self.isDone and self.prevMs < 0:
+            return -1
+
+        # getPrevFrame() may have been served from the back buffer, leaving
+        # the reader ahead of prevMs...
+        clipFrame = self._getBufferedFrame(1)
+        if clipFrame is not None:
+            return clipFrame.ms
+
+        self._pausePrefetch()
+
+        if self._needsRewind:
+            msList = self.getMsList()
+            if msList:
+                return msList[0]
+        self._syncSeqReader(True)
+
         reader = self._getSeqReader()
         if reader is None:
             return -1
@@ -342,10 +808,9 @@ class ClipReader(object):
 
     ###########################################################
     def setMute(self, _mute):
-        if self._seqReader is not None:
-            self._seqReader.setMute(_mute)
-        if self._randReader is not None:
-            self._randReader.setMute(_mute)
+        with self._readerLock:
+            for rdr in self._allReaders:
+                rdr.setMute(_mute)
 
     ###########################################################
     def seek(self, msOffset):
@@ -354,18 +819,22 @@ class ClipReader(object):
         @param  msoffset  The millisecond offset of the desired frame.
         @return frame     A ClipFrame of the requested frame, None on error.
         """
+        self._pausePrefetch()
+
         reader = self._getSeqReader()
         if reader is None:
             return None
 
         clipFrame = reader.seek(msOffset)
 
+        self._backBuffer.clear()
         if clipFrame is None:
             self._readerPrevMs = -1
             self.prevMs = -1
             return None
         self._readerPrevMs = clipFrame.ms
         self.prevMs = clipFrame.ms
+        self._backBuffer.append(clipFrame)
 
         return clipFrame
 
@@ -381,18 +850,79 @@ class ClipReader(object):
         @param  msoffset  The millisecond offset of the desired frame
         @return frame     A ClipFrame of the requested frame, None on error
         """
+        if self._singleReaderMode:
+            self._pausePrefetch()
+
         # Need to use random reader, since this will mess up the location...
         reader = self._getRandReader()
         if reader is None:
             return None
 
         clipFrame = reader.getFrameAt(msOffset)
+        self._noteRandomAccess(clipFrame)
+
         if clipFrame is None:
             return None
 
         return clipFrame
 
 
+    ###########################################################
+    def getFramesAt(self, msOffsets):
+        """Retrieve the frames closest to each of the given offsets.
+
+        This is much cheaper than calling getFrameAt() for each offset when
+        the offsets are near each other: the reader visits them in sorted
+        order and just decodes forward from one to the next, only seeking
+        when the gap is large.  The same caveat about mixing with
+        getNextFrame() applies.
+
+        @param  msOffsets  A list of millisecond offsets, in any order.
+        @return frames     A list of ClipFrames (or None on error), in the same
+                           order as msOffsets.
+        """
+        frames = [None] * len(msOffsets)
+        if not msOffsets:
+            return frames
+
+        if self._singleReaderMode:
+            self._pausePrefetch()
+
+        reader = self._getRandReader()
+        if reader is None:
+            return frames
+
+        frames = reader.getFramesAt(msOffsets)
+
+        # The reader finishes at the largest offset (the last one asked for,
+        # if there are ties)...
+        lastIndex = max(range(len(msOffsets)),
+                        key=lambda index: (msOffsets[index], index))
+        self._noteRandomAccess(frames[lastIndex])
+
+        return frames
+
+
+    ###########################################################
+    def _noteRandomAccess(self, clipFrame):
+        """Update our state after random access through the random reader.
+
+        In single reader mode that's also the sequential reader, so we note
+        where it's at; the next sequential read can then get back to prevMs.
+
+        @param  clipFrame  The last frame the reader returned; may be None.
+        """
+        if not self._singleReaderMode:
+            return
+
+        if self.prevMs < 0 and not self.isDone:
+            self._needsRewind = True
+        if clipFrame is None:
+            self._readerPrevMs = -1
+        else:
+            self._readerPrevMs = clipFrame.ms
+
+
     ###########################################################
     def markDone(self):
         """Arbitrarily marks the sequential reader as "done"."""
@@ -419,22 +949,89 @@ class ClipReader(object):
         self.width = resolution[0]
         self.height = resolution[1]
 
-        for rdr in (self._firstReader, self._randReader, self._seqReader):
-            if rdr is not None:
-                rdr.setOutputSize(resolution)
+        # Anything we prefetched or buffered is at the old size...
+        self._pausePrefetch()
+        self._backBuffer.clear()
+
+        for rdr in self._allReaders:
+            rdr.setOutputSize(resolution)
 
 ##############################################################################
 class ClipFrame(object):
     """Interface to the ClipFrames returned returned by ClipReader."""
+
+    # Set once release() has been called...
+    released = False
+
     ###########################################################
-    def asNumpy(self):
-        """Return a numpy version of our data.
+    def __enter__(self):
+        return self
+
+
+    ###########################################################
+    def __exit__(self, excType, excValue, tb):
+        self.release()
+
 
-        @return img  A numpy version of our data.
+    ###########################################################
+    def release(self):
+        """Let go of the frame's memory now, rather than whenever the frame
+        gets garbage collected.
+
+        Decoded frames come out of the decoder's buffer pool, so handing them
+        back promptly keeps that pool (and our memory use) small during long
+        reads.  The frame can't be used after this, though any numpy views
+        already taken from it stay valid.
+        """
+        self.released = True
+
+
+    ###########################################################
+    def getPixelBuffer(self):
+        """Return the memory holding our (packed) pixels.
+
+        Subclasses that implement this get asNumpy() (including its
+        zero-copy form) for free.
+
+        @return buffer    An object supporting the buffer protocol (like a
+                          ctypes array) over the pixels.  It must keep the
+                          pixel memory alive by itself, but should not
+                          reference the frame (that would make a cycle once
+                          the frame caches its numpy view).
+        @return width     The width of the frame, in pixels.
+        @return height    The height of the frame, in pixels.
+        @return stride    The number of bytes from one row to the next.
+        @return channels  The number of bytes per pixel.
         """
         raise NotImplementedError
 
 
+    ###########################################################
+    def asNumpy(self, copy=True):
+        """Return a numpy version of our data.
+
+        @param  copy  If True, return an array of the caller's own, which may
+                      be modified.  If False, return a read-only view straight
+                      onto getPixelBuffer(), so nothing is copied; the frame
+                      may be shared with other readers, which is why it can't
+                      be written to.
+        @return img   A numpy version of our data, as a height x width x
+                      channels array of uint8 (just height x width for single
+                      channel data).
+        """
+        import numpy
+
+        buf, width, height, stride, channels = self.getPixelBuffer()
+        img = numpy.frombuffer(buf, numpy.uint8, stride*height)
+        img = img.reshape(height, stride)[:, :width*channels]
+        if channels != 1:
+            img = img.reshape(height, width, channels)
+        if copy:
+            return img.copy()
+        img.flags.writeable = False
+        return img
+
+
     ###########################################################
     def asPil(self):
         """Return a PIL version of our data.
@@ -39,11 +39,10 @@ Contains an interface to clip manipulation functions from the videolib module.
 """
 
 
-from ctypes import CFUNCTYPE, POINTER, pointer, cdll, Structure, c_int
+from ctypes import CFUNCTYPE, POINTER, byref, pointer, cdll, Structure, c_int
 from ctypes import c_char_p, c_uint64, c_longlong
 from ctypes.util import find_library
 import os
-import sys
 
 from videoLib2.python.StreamReader import CodecConfig, getCodecConfig
 from videoLib2.python.VideoLibUtils import SetVideoLibDataPath, getTimestampFlags
@@ -66,6 +65,88 @@ class BoxOverlayInfo(Structure):
 
 
 
+##############################################################################
+class ClipExtras(object):
+    """The clip options from an extras dictionary, parsed once up front."""
+    __slots__ = ('boxList', 'fps', 'qualityProfile', 'maxSize', 'format',
+                 'timestampFlags')
+
+    ###########################################################
+    def __init__(self, boxList=(), fps=0, qualityProfile=None, maxSize=None,
+                 format="mp4", timestampFlags=0):
+        """ClipExtras constructor.
+
+        @param  boxList         A list of (ms, drawboxParams) to overlay.
+        @param  fps             The requested frame rate; 0 to keep the input's.
+        @param  qualityProfile  The requested quality profile; None if the
+                                codec config should decide.
+        @param  maxSize         A requested max (width, height), or None.
+        @param  format          The output container format.
+        @param  timestampFlags  TSOption flags for the timestamp overlay.
+        """
+        self.boxList = boxList
+        self.fps = fps
+        self.qualityProfile = qualityProfile
+        self.maxSize = maxSize
+        self.format = format
+        self.timestampFlags = timestampFlags
+
+
+    ###########################################################
+    @classmethod
+    def fromDict(cls, extras):
+        """Parse an extras dictionary, as passed to createClip.
+
+        @param  extras      The extras dictionary; may be None or a
+                            ClipExtras already.
+        @return clipExtras  A ClipExtras.
+        """
+        if isinstance(extras, ClipExtras):
+            return extras
+        if not extras:
+            return cls()
+
+        get = extras.get
+        return cls(get('boxList') or (), get('fps', 0),
+                   get(kClipQualityProfile), get('maxSize'),
+                   get('format', "mp4"), getTimestampFlags(extras))
+
+
+    ###########################################################
+    def needsTranscode(self):
+        """Decide whether a clip with these options can't just be remuxed.
+
+        @return needsTranscode  True if any of the options requires it.
+        """
+        return bool(self.boxList) \
+            or self.timestampFlags != 0 \
+            or self.format != 'mp4' \
+            or (self.qualityProfile or 0) != 0 \
+            or self.fps > 0 \
+            or (self.maxSize is not None and self.maxSize != (0,0))
+
+
+
+##############################################################################
+class ClipRequest(Structure):
+    """A single clip for create_clips; mirrors the create_clip parameters."""
+    _fields_ = [("numFiles", c_int),
+                ("filenames", POINTER(c_char_p)),
+                ("fileOffsetMs", POINTER(c_uint64)),
+                ("firstMs", c_uint64),
+                ("lastMs", c_uint64),
+                ("outfile", c_char_p),
+                ("codecConfig", POINTER(CodecConfig)),
+                ("timestampFlags", c_int),
+                ("numBoxes", c_int),
+                ("boxes", POINTER(BoxOverlayInfo)),
+                ("format", c_char_p),
+                ("fps", c_int),
+                # Filled in by the library: 0 on success, -1 on error
+                ("result", c_int)]
+
+
+
 LOGFUNC = CFUNCTYPE(None, c_int, c_char_p)
 PROGFUNC = CFUNCTYPE(c_int, c_int)
 
@@ -74,6 +155,9 @@ _videolib.create_clip.argtypes = [c_int, POINTER(c_char_p), POINTER(c_uint64),
         c_uint64, c_uint64, c_char_p, POINTER(CodecConfig),
         c_int, c_int, POINTER(BoxOverlayInfo), c_char_p, c_int, LOGFUNC, PROGFUNC]
 _videolib.create_clip.restype = c_uint64
+_videolib.create_clips.argtypes = [c_int, POINTER(ClipRequest), LOGFUNC,
+        PROGFUNC]
+_videolib.create_clips.restype = c_int
 _videolib.preserve_aspect_ratio.argtypes = [c_int, c_int, POINTER(c_int),
         POINTER(c_int), c_int]
 _videolib.preserve_aspect_ratio.restype = None
@@ -88,6 +172,26 @@ SetVideoLibDataPath()
 def defaultProggressCb(pct):
     return 0
 
+# Default callbacks are stateless, so build the ctypes objects only once.  The
+# default logger lives in the library itself, so logging from the library's
+# threads doesn't need to take the GIL...
+_defaultLogFn = LOGFUNC(("videolib_stderr_log", _videolib))
+_defaultProgFn = PROGFUNC(defaultProggressCb)
+
+###########################################################
+def _encodeFilenames(origFiles):
+    """Build the C array of filenames for the clip functions.
+
+    @param  origFiles  A list of (filename, offset), as passed to createClip.
+    @return filenames  A c_char_p array of utf-8 encoded filenames.
+    @return encoded    The encoded filenames; callers must hold on to this
+                       until the C call returns, since the array only points
+                       into these objects.
+    """
+    encoded = [f.encode('utf-8') for f, _ in origFiles]
+    return (c_char_p*len(encoded))(*encoded), encoded
+
+
 ###########################################################
 def remuxClip(origFiles, newFile, firstMs, lastMs, configDir, extras,
         logFn=None, progFn=None):
@@ -107,35 +211,28 @@ def remuxClip(origFiles, newFile, firstMs, lastMs, configDir, extras,
     @return success    Actual offset of the clip, or -1 for error
     """
     if logFn is None:
-        logFn = LOGFUNC(lambda lvl, s: sys.stderr.write("%d: %s" % (lvl,s)))
+        logFn = _defaultLogFn
     if progFn is None:
-        progFn = PROGFUNC(defaultProggressCb)
-
-    maxSize = extras.get('maxSize', None)
-    if len(extras.get('boxList', [])) > 0 \
-       or extras.get('enableTimestamps', False) \
-       or extras.get('format', 'mp4') != 'mp4' \
-       or extras.get(kClipQualityProfile, 0) != 0 \
-       or extras.get('fps',0) > 0 \
-       or (maxSize is not None and maxSize != (0,0)):
+        progFn = _defaultProgFn
+
+    clipExtras = ClipExtras.fromDict(extras)
+    if clipExtras.needsTranscode():
         # if quality setting isn't explicitly set, default to the a very high value
         # (we were prepared to remux after all)
-        if not kClipQualityProfile in extras:
-            extras[kClipQualityProfile] = 5 # svvpVeryHigh
-        return createClip(origFiles, newFile, firstMs, lastMs, configDir, extras, logFn, progFn)
-
-    fmt = extras.get('format', "mp4")
+        if clipExtras.qualityProfile is None:
+            clipExtras.qualityProfile = 5 # svvpVeryHigh
+            if isinstance(extras, dict):
+                extras[kClipQualityProfile] = clipExtras.qualityProfile
+        return createClip(origFiles, newFile, firstMs, lastMs, configDir, clipExtras, logFn, progFn)
+
+    fmtUtf8 = clipExtras.format.encode('utf-8')
+    newFileUtf8 = newFile.encode('utf-8')
     numFiles = len(origFiles)
-    filenames = (c_char_p*numFiles)()
-    offsets = (c_uint64*numFiles)()
-
-    for i in range(numFiles):
-        filename, offset = origFiles[i]
-        filenames[i] = filename.encode('utf-8')
-        offsets[i] = offset
+    filenames, _encoded = _encodeFilenames(origFiles)
+    offsets = (c_uint64*numFiles)(*[o for _, o in origFiles])
 
-    res = _videolib.fast_create_clip(len(origFiles), filenames, offsets,
-            firstMs, lastMs, newFile.encode('utf-8'), fmt, logFn, progFn)
+    res = _videolib.fast_create_clip(numFiles, filenames, offsets,
+            firstMs, lastMs, newFileUtf8, fmtUtf8, logFn, progFn)
     if res == _kCreateClipError:
         return -1
     return int(res)
@@ -189,7 +286,8 @@ def createClip(origFiles, newFile, firstMs, lastMs, configDir,
     @param  firstMs    The offset into the first file to start copying.
     @param  lastMs     The offset into the last file at which to stop copying.
     @param  configDir  Directory to search for config files.
-    @param  extras     A dictionary of optional parameters:
+    @param  extras     A dictionary of optional parameters (or a ClipExtras
+                       that was already parsed from one):
                        'boxList' - a list of (ms, drawboxParams) to overlay
                        'max_bit_rate' - a requested max bitrate for the clip
                        'maxSize' - a requested max bitrate for the clip
@@ -198,43 +296,79 @@ def createClip(origFiles, newFile, firstMs, lastMs, configDir,
     @param  progFn     Function for reporting progress/aborting the call
     @return success    Actual offset of the clip, or -1 for error
     """
+    return createClips([(origFiles, newFile, firstMs, lastMs, configDir,
+                         extras)], logFn, progFn)[0]
+
+
+###########################################################
+def createClips(clips, logFn=None, progFn=None):
+    """Create a number of clips by transcoding, with a single library call.
+
+    @param  clips     A list of (origFiles, newFile, firstMs, lastMs,
+                      configDir, extras); see createClip for what these are.
+                      extras may be a dictionary or a ClipExtras.
+    @param  logFn     Function for logging; should be suitable for
+                      passing to ctypes.
+    @param  progFn    Function for reporting progress/aborting the call; it's
+                      called for each clip in turn.
+    @return results   A list with the result of each clip, as createClip
+                      would have returned it.
+    """
     if logFn is None:
-        logFn = LOGFUNC(lambda lvl, s: sys.stderr.write("%d: %s" % (lvl,s)))
+        logFn = _defaultLogFn
     if progFn is None:
-        progFn = PROGFUNC(defaultProggressCb)
+        progFn = _defaultProgFn
 
-    boxList = extras.get('boxList', [])
-    fps = extras.get('fps', 0)
-    enableTimestamps = getTimestampFlags(extras)
+    # The requests only point at the arrays and strings they use, so we need
+    # to hold on to those until the call returns...
+    keepAlive = []
+    requests = (ClipRequest*len(clips))(*[_buildClipRequest(keepAlive, *clip)
+                                          for clip in clips])
 
-    config = getCodecConfig(configDir)
-    config.sv_profile = int(extras.get(kClipQualityProfile, config.sv_profile))
-    if "maxSize" in extras:
-        config.max_width = extras['maxSize'][0]
-        config.max_height = extras['maxSize'][1]
+    _videolib.create_clips(len(clips), requests, logFn, progFn)
+
+    return [-1 if req.result != 0 else 0 for req in requests]
 
-    fmt = extras.get('format', "mp4")
+
+###########################################################
+def _buildClipRequest(keepAlive, origFiles, newFile, firstMs, lastMs,
+        configDir, extras):
+    """Build the ClipRequest for a single clip.
+
+    @param  keepAlive  A list we'll add all the objects the request points
+                       to; it must outlive the request.
+    @param  ...        See createClip.
+    @return request    The ClipRequest.
+    """
+    clipExtras = ClipExtras.fromDict(extras)
+    boxList = clipExtras.boxList
+
+    config = getCodecConfig(configDir)
+    if clipExtras.qualityProfile is not None:
+        config.sv_profile = int(clipExtras.qualityProfile)
+    if clipExtras.maxSize is not None:
+        config.max_width = clipExtras.maxSize[0]
+        config.max_height = clipExtras.maxSize[1]
+
+    fmtUtf8 = clipExtras.format.encode('utf-8')
+    newFileUtf8 = newFile.encode('utf-8')
     numFiles = len(origFiles)
     numBoxes = len(boxList)
-    filenames = (c_char_p*numFiles)()
-    offsets = (c_uint64*numFiles)()
-    boxes = (BoxOverlayInfo*numBoxes)()
-
-    for i in range(numFiles):
-        filename, offset = origFiles[i]
-        filenames[i] = filename.encode('utf-8')
-        offsets[i] = offset
-
-    for i in range(len(boxList)):
-        ms, text = boxList[i]
-        boxes[i] = BoxOverlayInfo(ms, text)
-
-    res = _videolib.create_clip(len(origFiles), filenames, offsets, firstMs,
-            lastMs, newFile.encode('utf-8'), config, enableTimestamps,
-            numBoxes, boxes, fmt, fps, logFn, progFn)
-    if res == _kCreateClipError:
-        return -1
-    return int(res)
+    filenames, encoded = _encodeFilenames(origFiles)
+    offsets = (c_uint64*numFiles)(*[o for _, o in origFiles])
+    if boxList:
+        boxes = (BoxOverlayInfo*numBoxes)(*[BoxOverlayInfo(ms, text)
+                                            for ms, text in boxList])
+    else:
+        # The library treats NULL the same as no boxes (see fast_create_clip)
+        boxes = None
+
+    keepAlive.extend((config, fmtUtf8, newFileUtf8, filenames, encoded,
+                      offsets, boxes))
+
+    return ClipRequest(numFiles, filenames, offsets, firstMs, lastMs,
+            newFileUtf8, pointer(config), clipExtras.timestampFlags, numBoxes,
+            boxes, fmtUtf8, clipExtras.fps, 0)
 
 
 ###########################################################
@@ -248,8 +382,9 @@ def getRealClipSize(sourceWidth, sourceHeight, requestedWidth, requestedHeight):
     @return outputWidth    The actual output width.
     @return outputHeight   The actual output height.
     """
-    pointerWidth = pointer(c_int(requestedWidth))
-    pointerHeight = pointer(c_int(requestedHeight))
-    _videolib.preserve_aspect_ratio(sourceWidth, sourceHeight, pointerWidth,
-            pointerHeight, 1)
-    return pointerWidth.contents.value, pointerHeight.contents.value
+    # Local to each call, so this is safe to use from multiple threads...
+    width = c_int(requestedWidth)
+    height = c_int(requestedHeight)
+    _videolib.preserve_aspect_ratio(sourceWidth, sourceHeight, byref(width),
+            byref(height), 1)
+    return width.value, height.value
@@ -39,21 +39,17 @@
 Contains an interface to the c videolib clips module.
 """
 
-from ctypes import CFUNCTYPE, POINTER, Structure, c_void_p, c_int
+from ctypes import CFUNCTYPE, POINTER, Structure, c_void_p, c_int, c_ubyte
 from ctypes import c_char_p, c_longlong, byref, c_uint64, c_int64
+from ctypes import addressof, memmove
 import sys
 import os
 import traceback
 
 from vitaToolbox.ctypesUtils.PtrFreer import PtrFreer, withByref
-
-from vitaToolbox.image.ImageConversion import convertClipFrameToPIL
-from vitaToolbox.image.ImageConversion import convertClipFrameToWxBitmap
-from vitaToolbox.image.ImageConversion import convertClipFrameToNumpy
-from vitaToolbox.image.ImageConversion import convertNumpyToPilNoNorm
-from vitaToolbox.image.ImageConversion import convertClipFrameToBuffer
 from vitaToolbox.ctypesUtils.LoadLibrary import LoadLibrary
 from vitaToolbox.loggingUtils.LoggingUtils import getStderrLogCB, kLogLevelCritical
+from vitaToolbox.loggingUtils.LoggingUtils import kLogLevelError
 from vitaToolbox.process.ProcessUtils import getMemoryStats
 from vitaToolbox.strUtils.EnsureUnicode import ensureUtf8
 
@@ -91,13 +87,36 @@ class FfMpegClipFrameStruct(Structure):
 
 LOGFUNC = CFUNCTYPE(None, c_int, c_char_p)
 
+# Log callback used when the caller doesn't give us one.  Built once, since
+# each LOGFUNC() makes a new C thunk; keeping it at module scope also means
+# it can't be collected while the library holds on to it...
+_defaultLogFn = LOGFUNC(getStderrLogCB())
+
+# Planar pixel formats that can be asked for with the 'pixFmt' extra, mapped
+# to the name of the matching OpenCV YUV->RGB conversion...
+_kYuvPixFmts = {
+    'yuv420p' : 'COLOR_YUV2RGB_I420',
+    'nv12'    : 'COLOR_YUV2RGB_NV12',
+}
+
 # Set function argument and return types
 _lib.open_clip.argtypes = [c_char_p, c_int, c_int, c_uint64, c_int, c_int, c_int, c_int, c_int, c_int, POINTER(BoxOverlayInfo), c_int, POINTER(BoxOverlayInfo), LOGFUNC]
 _lib.open_clip.restype = c_void_p
+_lib.open_clip2.argtypes = [c_char_p, c_int, c_int, c_uint64, c_int, c_int, c_int, c_int, c_int, c_int, POINTER(BoxOverlayInfo), c_int, POINTER(BoxOverlayInfo), c_char_p, LOGFUNC]
+_lib.open_clip2.restype = c_void_p
 _lib.get_output_width.argtypes = [c_void_p]
 _lib.get_output_width.restype = c_int
 _lib.get_output_height.argtypes = [c_void_p]
 _lib.get_output_height.restype = c_int
+_lib.get_output_size.argtypes = [c_void_p, POINTER(c_int), POINTER(c_int)]
+_lib.get_output_size.restype = None
+_lib.get_clip_pix_fmt.argtypes = [c_void_p]
+_lib.get_clip_pix_fmt.restype = c_char_p
+_lib.get_default_clip_pix_fmt.argtypes = []
+_lib.get_default_clip_pix_fmt.restype = c_char_p
+_lib.get_frame_planes.argtypes = [c_char_p, c_int, c_int, POINTER(c_int),
+        POINTER(c_int), POINTER(c_int), POINTER(c_int), c_int]
+_lib.get_frame_planes.restype = c_int
 _lib.get_input_width.argtypes = [c_void_p]
 _lib.get_input_width.restype = c_int
 _lib.get_input_height.argtypes = [c_void_p]
@@ -111,12 +130,18 @@ _lib.get_clip_length.restype = c_longlong
 _lib.free_clip_stream.argtypes = [c_void_p]
 _lib.get_next_frame.argtypes = [c_void_p]
 _lib.get_next_frame.restype = POINTER(FfMpegClipFrameStruct)
+_lib.get_next_frames.argtypes = [c_void_p, c_int,
+        POINTER(POINTER(FfMpegClipFrameStruct)), POINTER(c_longlong)]
+_lib.get_next_frames.restype = c_int
 _lib.get_prev_frame.argtypes = [c_void_p]
 _lib.get_prev_frame.restype = POINTER(FfMpegClipFrameStruct)
 _lib.get_next_frame_offset.argtypes = [c_void_p]
 _lib.get_next_frame_offset.restype = c_longlong
 _lib.get_frame_at.argtypes = [c_void_p, c_longlong]
 _lib.get_frame_at.restype = POINTER(FfMpegClipFrameStruct)
+_lib.get_frames_at_batch.argtypes = [c_void_p, POINTER(c_longlong), c_int,
+                                     POINTER(POINTER(FfMpegClipFrameStruct))]
+_lib.get_frames_at_batch.restype = c_int
 _lib.free_clip_frame.argtypes = [POINTER(POINTER(FfMpegClipFrameStruct))]
 _lib.get_ms_list.argtypes = [c_void_p]
 _lib.get_ms_list.restype = POINTER(c_longlong)
@@ -127,24 +152,105 @@ _lib.get_duration.restype = c_int64
 _lib.free_ms_list.argtypes = [POINTER(POINTER(c_longlong))]
 _lib.set_output_size.argtypes = [c_void_p, c_int, c_int]
 _lib.set_output_size.restype = c_int
+_lib.set_output_size2.argtypes = [c_void_p, c_int, c_int, POINTER(c_int), POINTER(c_int)]
+_lib.set_output_size2.restype = c_int
+
+# The freer we attach to every frame struct; it's the same for all of them...
+_freeClipFrame = withByref(_lib.free_clip_frame)
+
+# The per-frame calls, looked up once rather than off of _lib every time...
+_getNextFrame = _lib.get_next_frame
+_getNextFrames = _lib.get_next_frames
+_getPrevFrame = _lib.get_prev_frame
+_getFrameAt = _lib.get_frame_at
+_getFramesAtBatch = _lib.get_frames_at_batch
+_getNextFrameOffset = _lib.get_next_frame_offset
+
+# The name of the packed 24-bit format frames come in by default.  It's the
+# only 24-bit one we accept for 'pixFmt', since the image conversions assume
+# it; asking for the other channel order would swap red and blue...
+_kDefaultPixFmt = _lib.get_default_clip_pix_fmt().decode('ascii')
+
+# The most planes any of our pixel formats has...
+_kMaxPlanes = 4
+
+# Plane layouts we've asked the library for, by (pixFmt, width, height)...
+_planeLayouts = {}
 
 SetVideoLibDataPath()
 
 
+##############################################################################
+def _getPlaneLayout(pixFmt, width, height):
+    """Return how a frame's planes are laid out in its buffer.
+
+    @param  pixFmt   The frame's pixel format; None for the default one.
+    @param  width    The width of the frame.
+    @param  height   The height of the frame.
+    @return planes   A list of (offset, stride, rowBytes, rows) per plane.
+    @return packed   True if the planes follow each other with no padding.
+    @return size     The number of bytes of pixel data, without padding.
+    """
+    key = (pixFmt, width, height)
+    layout = _planeLayouts.get(key)
+    if layout is None:
+        offsets = (c_int * _kMaxPlanes)()
+        strides = (c_int * _kMaxPlanes)()
+        rowBytes = (c_int * _kMaxPlanes)()
+        rows = (c_int * _kMaxPlanes)()
+        numPlanes = _lib.get_frame_planes(ensureUtf8(pixFmt) if pixFmt else None,
+                                          width, height, offsets, strides,
+                                          rowBytes, rows, _kMaxPlanes)
+        if numPlanes <= 0:
+            raise ValueError("No plane layout for a %dx%d %s frame" %
+                             (width, height, pixFmt or _kDefaultPixFmt))
+
+        planes = [(offsets[i], strides[i], rowBytes[i], rows[i])
+                  for i in range(numPlanes)]
+        packed = True
+        pos = 0
+        for offset, stride, planeRowBytes, planeRows in planes:
+            if offset != pos or stride != planeRowBytes:
+                packed = False
+            pos += planeRowBytes * planeRows
+
+        layout = (planes, packed, pos)
+        _planeLayouts[key] = layout
+
+    return layout
+
+
 ##############################################################################
 class FfMpegClipFrame(ClipFrame):
     """A class for accessing video frames."""
     ###########################################################
-    def __init__(self, structPtr, width, height):
+    def __init__(self, structPtr, width, height, pixFmt=None):
         """FfMpegClipFrame constructor.
 
+        @param  structPtr  A FfMpegClipFrameStruct pointer
+        @param  width      The width of the frame.
+        @param  height     The height of the frame.
+        @param  pixFmt     The pixel format the reader was opened with; None
+                           for the default (packed 24-bit) one.
+        """
+        self.pixFmt = pixFmt
+        self.bind(structPtr, width, height)
+
+
+    ###########################################################
+    def bind(self, structPtr, width, height):
+        """Point this object at a different decoded frame.
+
+        Anything we had converted is dropped.  The old frame is freed once
+        nothing else (like a numpy view of it) references it.
+
         @param  structPtr  A FfMpegClipFrameStruct pointer
         @param  width      The width of the frame.
         @param  height     The height of the frame.
         """
         # Add a freer to the structure so that when there are no more
         # references to it, it will be freed automatically...
-        structPtr.__freer = PtrFreer(structPtr, withByref(_lib.free_clip_frame))
+        structPtr.__freer = PtrFreer(structPtr, _freeClipFrame)
 
         # Save the struct parameters; made public so that convertClipFrameToIpl
         # can add references to it...
@@ -157,30 +263,138 @@ class FfMpegClipFrame(ClipFrame):
         # ImageConversion...
         self.width = width
         self.height = height
-        self.buffer = c_void_p(self.structPtr.contents.dataBuffer)
+        self._buffer = None
+        self.pilFrame = None
+        self.numpyFrame = None
+        self.numpyView = None
+        self.rawBuffer = None
+        self.wxBuffer = None
+        self.released = False
+
+
+    ###########################################################
+    @property
+    def buffer(self):
+        """A c_void_p of the pixel data, used by ImageConversion.
+
+        This is only made when asked for, since the numpy path doesn't need
+        it.  It holds a reference to the structPtr, so memory will be alive
+        as long as this pointer is alive.
+        """
+        if self._buffer is None and self.structPtr is not None:
+            self._buffer = c_void_p(self.structPtr.contents.dataBuffer)
+            self._buffer.__refToStructPtr = self.structPtr
+
+        return self._buffer
+
+
+    ###########################################################
+    def release(self):
+        """Let go of the frame's memory now.
+
+        The C frame gets freed (and its buffer returned to the decoder's pool)
+        as soon as nothing else, like a numpy view, references it.
+        """
+        super(FfMpegClipFrame, self).release()
+
+        self.structPtr = None
+        self._buffer = None
         self.pilFrame = None
         self.numpyFrame = None
+        self.numpyView = None
         self.rawBuffer = None
         self.wxBuffer = None
 
-        # Add a direct reference to the structPtr.  That way memory will be
-        # alive as long as this pointer is alive...
-        self.buffer.__refToStructPtr = structPtr
+
+    ###########################################################
+    def getPixelBuffer(self):
+        """Return the memory holding our pixels.
+
+        For the default (packed 24-bit) format that's one row per line of the
+        image.  For the planar YUV formats, it's a single channel buffer of
+        height*3/2 rows: the Y plane followed by the chroma, with no padding.
+        When the library pads the rows of its planes, that means a copy.
+
+        @return buffer    A ctypes array over the pixels; it keeps the frame
+                          data alive.
+        @return width     The width of the frame, in pixels.
+        @return height    The number of rows in the buffer.
+        @return stride    The number of bytes from one row to the next.
+        @return channels  The number of bytes per pixel.
+        """
+        planes, packed, size = _getPlaneLayout(self.pixFmt, self.width, self.height)
+        dataBuffer = self.structPtr.contents.dataBuffer
+
+        if self.pixFmt not in _kYuvPixFmts:
+            _, stride, _, _ = planes[0]
+            width, height, channels = self.width, self.height, 3
+            buf = (c_ubyte * (stride * height)).from_address(dataBuffer)
+            buf.__refToStructPtr = self.structPtr
+            return buf, width, height, stride, channels
+
+        width, height, channels = self.width, self.height * 3 // 2, 1
+        stride = width
+        if packed:
+            buf = (c_ubyte * (stride * height)).from_address(dataBuffer)
+            buf.__refToStructPtr = self.structPtr
+        else:
+            # Gather the rows of each plane into one tightly packed buffer...
+            buf = (c_ubyte * max(size, stride * height))()
+            dst = addressof(buf)
+            for offset, planeStride, rowBytes, rows in planes:
+                src = dataBuffer + offset
+                for _ in range(rows):
+                    memmove(dst, src, rowBytes)
+                    dst += rowBytes
+                    src += planeStride
+
+        return buf, width, height, stride, channels
+
+
+    ###########################################################
+    def _yuvAsRgbNumpy(self):
+        """Convert our planar YUV data to a RGB numpy array.
+
+        @return img  A height x width x 3 numpy array.
+        """
+        import cv2
+        code = getattr(cv2, _kYuvPixFmts[self.pixFmt])
+        return cv2.cvtColor(self.asNumpy(copy=False), code)
 
 
     ###########################################################
-    def asNumpy(self):
+    def asNumpy(self, copy=True):
         """Return a numpy version of our data.
 
-        @return img  A numpy version of our data.
+        @param  copy  If True, return a copy that the caller may modify.  If
+                      False, return a read-only view of the decoded frame.
+        @return img   A numpy version of our data.
         """
 
+        if self.numpyView is None:
+            self.numpyView = super(FfMpegClipFrame, self).asNumpy(copy=False)
+        if not copy:
+            return self.numpyView
+
         if self.numpyFrame is None:
-            self.numpyFrame = convertClipFrameToNumpy(self)
+            self.numpyFrame = self.numpyView.copy()
 
         return self.numpyFrame
 
 
+    ###########################################################
+    def __array__(self, dtype=None):
+        """Let numpy.asarray(frame) return our read-only numpy view.
+
+        The view is based on the pixel buffer, which holds a reference to the
+        decoded frame, so it stays valid after release() or bind().
+        """
+        img = self.asNumpy(copy=False)
+        if dtype is not None:
+            return img.astype(dtype)
+        return img
+
+
     ###########################################################
     def asPil(self):
         """Return a PIL version of our data.
@@ -189,7 +403,16 @@ class FfMpegClipFrame(ClipFrame):
         """
 
         if self.pilFrame is None:
-            self.pilFrame = convertClipFrameToPIL(self)
+            # Image conversion pulls in PIL, numpy and wx, which users that
+            # just want durations or ms lists shouldn't have to pay for...
+            if self.pixFmt in _kYuvPixFmts:
+                from vitaToolbox.image.ImageConversion import \
+                    convertNumpyToPilNoNorm
+                self.pilFrame = convertNumpyToPilNoNorm(self._yuvAsRgbNumpy())
+            else:
+                from vitaToolbox.image.ImageConversion import \
+                    convertClipFrameToPIL
+                self.pilFrame = convertClipFrameToPIL(self)
 
         return self.pilFrame
 
@@ -200,7 +423,11 @@ class FfMpegClipFrame(ClipFrame):
 
         @return img  A raw version of our data.
         """
+        if self.pixFmt in _kYuvPixFmts:
+            raise ValueError("Raw buffers need a 24-bit pixel format")
         if self.rawBuffer is None:
+            from vitaToolbox.image.ImageConversion import \
+                convertClipFrameToBuffer
             self.rawBuffer = convertClipFrameToBuffer( self )
 
         return self.rawBuffer
@@ -211,17 +438,43 @@ class FfMpegClipFrame(ClipFrame):
 
         @return img  A raw version of our data.
         """
+        if self.pixFmt in _kYuvPixFmts:
+            raise ValueError("wx buffers need a 24-bit pixel format")
         if self.wxBuffer is None:
+            from vitaToolbox.image.ImageConversion import \
+                convertClipFrameToWxBitmap
             self.wxBuffer = convertClipFrameToWxBitmap( self )
 
         return self.wxBuffer
 
+##############################################################################
+def _formatOpenError(filename, fileExists, width, height, firstMs, enableAudio,
+                     enableThread, enableDebug, enableTimestamp, boxList,
+                     zonesList):
+    """Describe a failed FfMpegClipReader.open() for the log.
+
+    Must be called from the except clause, since it includes the traceback.
+
+    @param  filename    The UTF-8 filename that was being opened.
+    @param  fileExists  True if the file was there.
+    @param  ...         The rest of the parameters that were used.
+    @return msg         The message to log.
+    """
+    return ("Exception opening a clip at %s (%s) w=%s h=%s firstMs=%s "
+            "audio=%s thread=%s debug=%s timestamp=%s boxesCount=%d boxes=%r "
+            "zonesCount=%d zones=%r\n%s" % (
+                filename, "exists" if fileExists else "does not exist",
+                width, height, firstMs, enableAudio, enableThread, enableDebug,
+                enableTimestamp, len(boxList), boxList, len(zonesList),
+                zonesList, traceback.format_exc()))
+
+
 ##############################################################################
 def getDuration(filename, logFn=None):
     """ A light(er)-weight utility to retrieve clip duration
     """
     if logFn is None:
-        logFn = LOGFUNC(getStderrLogCB())
+        logFn = _defaultLogFn
 
     return _lib.get_duration(ensureUtf8(filename), logFn)
 
@@ -230,16 +483,60 @@ def getMsList(filename, logFn=None):
     """ A light(er)-weight utility to retrieve frame timestamps of a file
     """
     if logFn is None:
-        logFn = LOGFUNC(getStderrLogCB())
-
-    msListPtr = _lib.get_ms_list2(ensureUtf8(filename), logFn)
-    if msListPtr:
-        msList = [msListPtr[i] for i in xrange(1, msListPtr[0]+1)]
-        _lib.free_ms_list(byref(msListPtr))
-        return msList
-    else:
+        logFn = _defaultLogFn
+
+    return _takeMsList(_lib.get_ms_list2(ensureUtf8(filename), logFn))
+
+
+##############################################################################
+def _takeMsList(msListPtr):
+    """Copy an ms list returned by the library and free it.
+
+    @param  msListPtr  The list from get_ms_list or get_ms_list2; the first
+                       entry is the count.  May be NULL.
+    @return msList     A list of offsets of each frame in the clip.
+    """
+    if not msListPtr:
         return []
 
+    # Slicing copies the whole thing in one go, rather than indexing the
+    # pointer once per frame...
+    msList = msListPtr[1:msListPtr[0]+1]
+    _lib.free_ms_list(byref(msListPtr))
+    return msList
+
+
+##############################################################################
+class _ClipStreamFreer(object):
+    """Frees an open clip stream when asked to or when garbage collected.
+
+    This holds nothing but the stream's address, so unlike a __del__ on the
+    reader it can never end up in a reference cycle.
+    """
+    # Kept on the class, since module globals may already be None if we're
+    # collected during interpreter shutdown...
+    _freeClipStream = _lib.free_clip_stream
+    _byref = byref
+    _voidPtr = c_void_p
+
+    ###########################################################
+    def __init__(self, clip):
+        """_ClipStreamFreer constructor.
+
+        @param  clip  The address returned by open_clip2().
+        """
+        self._clip = clip
+
+
+    ###########################################################
+    def free(self):
+        """Free the stream now; further calls do nothing."""
+        clip, self._clip = self._clip, None
+        if clip:
+            self._freeClipStream(self._byref(self._voidPtr(clip)))
+
+    __del__ = free
+
 
 
 ##############################################################################
@@ -253,19 +550,30 @@ class FfMpegClipReader(object):
                             passing to ctypes.
         """
         if logFn is None:
-            logFn = LOGFUNC(getStderrLogCB())
+            logFn = _defaultLogFn
         self._logFn = logFn
 
+        # The clip handle; _clipFreer owns it and frees it when we're done...
         self._clip = None
+        self._clipFreer = None
         self._mute = False
         self._width = None
         self._height = None
+        self._pixFmt = None
+        self._filenameUtf8 = None
 
+        # Out params for the output size, so it comes back in one call...
+        self._outWidth = c_int()
+        self._outHeight = c_int()
+        self._outWidthRef = byref(self._outWidth)
+        self._outHeightRef = byref(self._outHeight)
 
-    ###########################################################
-    def __del__(self):
-        """Free resources used by FfMpegClipReader"""
-        self.close()
+        # The (key, array) of the last box and zone overlays we built...
+        self._boxCache = (None, None)
+        self._zoneCache = (None, None)
+
+        # Output array for getNextFrames(); kept around between calls...
+        self._framePtrs = None
 
 
     ###########################################################
@@ -280,7 +588,12 @@ class FfMpegClipReader(object):
         if self._clip:
             self.close()
 
+        # Convert once; the same bytes are used for the open and any logging,
+        # and are kept alive alongside the clip...
+        self._filenameUtf8 = filenameUtf8 = ensureUtf8(filename)
 
+        boxList = ()
+        zonesList = ()
         boxes = None
         zones = None
         numBoxes = 0
@@ -290,80 +603,108 @@ class FfMpegClipReader(object):
         enableDebug = 0
         enableTimestamp = 0
         keyframeOnly = 0
+        pixFmt = None
         if not extras is None:
             boxList = extras.get('boxList', [])
             zonesList = extras.get('zonesList', [])
             numBoxes = len(boxList)
-            boxes = (BoxOverlayInfo*numBoxes)()
+            boxes = self._getOverlayArray('_boxCache', boxList)
             numZones = len(zonesList)
-            zones = (BoxOverlayInfo*numZones)()
+            zones = self._getOverlayArray('_zoneCache', zonesList)
             enableAudio = extras.get('enableAudio', 0)
             enableDebug = extras.get('enableDebug', 0)
             enableTimestamp = getTimestampFlags(extras)
             enableThread = extras.get('asyncRead', 0)
             keyframeOnly = extras.get('keyframeOnly', 0)
+            pixFmt = extras.get('pixFmt', None)
             self._mute = extras.get('audioMute', self._mute)
 
-
-        for i in range(numBoxes):
-            ms, text = boxList[i]
-            boxes[i] = BoxOverlayInfo(ms, text)
-
-        for i in range(numZones):
-            ms, text = zonesList[i]
-            zones[i] = BoxOverlayInfo(ms, text)
+        if pixFmt and pixFmt.lower() not in _kYuvPixFmts and \
+           pixFmt.lower() != _kDefaultPixFmt:
+            self._logFn(kLogLevelError, "Unsupported pixel format '%s'; use "
+                        "one of %s or the default (%s)" % (pixFmt,
+                        ", ".join(sorted(_kYuvPixFmts)), _kDefaultPixFmt))
+            return False
 
         try:
-            self._clip = c_void_p(_lib.open_clip( ensureUtf8(filename),
-                                                  width,
-                                                  height,
-                                                  firstMs,
-                                                  enableAudio,
-                                                  enableThread,
-                                                  enableDebug,
-                                                  enableTimestamp,
-                                                  keyframeOnly,
-                                                  numBoxes,
-                                                  boxes,
-                                                  numZones,
-                                                  zones,
-                                                  self._logFn ))
+            # Keep the plain address; ctypes passes ints as c_void_p without
+            # building a new wrapper for every call...
+            self._clip = _lib.open_clip2( filenameUtf8,
+                                          width,
+                                          height,
+                                          firstMs,
+                                          enableAudio,
+                                          enableThread,
+                                          enableDebug,
+                                          enableTimestamp,
+                                          keyframeOnly,
+                                          numBoxes,
+                                          boxes,
+                                          numZones,
+                                          zones,
+                                          ensureUtf8(pixFmt) if pixFmt else None,
+                                          self._logFn )
             if self._clip:
-                self._width = _lib.get_output_width(self._clip)
-                self._height = _lib.get_output_height(self._clip)
+                self._clipFreer = _ClipStreamFreer(self._clip)
+                # Ask what we actually got; overlays make the library fall
+                # back to the default format whatever we asked for...
+                clipPixFmt = _lib.get_clip_pix_fmt(self._clip)
+                if clipPixFmt is not None:
+                    clipPixFmt = clipPixFmt.decode('ascii')
+                if clipPixFmt in _kYuvPixFmts:
+                    self._pixFmt = clipPixFmt
+                else:
+                    self._pixFmt = None
+                _lib.get_output_size(self._clip, self._outWidthRef,
+                                     self._outHeightRef)
+                self._width = self._outWidth.value
+                self._height = self._outHeight.value
                 self.setMute(self._mute)
                 return True
-        except:
-            try:
-                fileExists = "exists" if os.path.isfile(filename) else "does not exist"
-                self._logFn(kLogLevelCritical, "Exception opening a clip at " + ensureUtf8(filename) + "("+ fileExists + ")" )
-                self._logFn(kLogLevelCritical, "w=" + str(width) + " h=" + str(height) + \
-                                            " firstMs=" + str(firstMs) + " audio=" + str(enableAudio) + \
-                                            " thread=" + str(enableThread) + " debug=" + str(enableDebug) + \
-                                            " timestamp=" + str(enableTimestamp) + \
-                                            " boxesCount=" + str(numBoxes) + \
-                                            " boxes=" + str(boxList) + \
-                                            " zonesCount=" + str(numZones) + \
-                                            " zones=" + str(zonesList) + \
-                                            traceback.format_exc() )
-                self._logFn(kLogLevelCritical, "Memory: " + str(getMemoryStats(os.getpid())))
-            except:
-                self._logFn(kLogLevelCritical, "Critical exception opening a clip at " + ensureUtf8(filename) )
+        except Exception:
+            self._logFn(kLogLevelCritical, _formatOpenError(
+                    filenameUtf8, os.path.isfile(filename), width, height,
+                    firstMs, enableAudio, enableThread, enableDebug,
+                    enableTimestamp, boxList, zonesList))
+            self._logFn(kLogLevelCritical,
+                        "Memory: %s" % (getMemoryStats(os.getpid()),))
 
+        return False
 
 
-        return False
+    ###########################################################
+    def _getOverlayArray(self, cacheAttr, overlayList):
+        """Return a BoxOverlayInfo array for the given overlays.
+
+        The last array built for each kind of overlay is kept, since things
+        like scrubbing reopen clips with the same overlays over and over.
+
+        @param  cacheAttr    The attribute holding the (key, array) cache.
+        @param  overlayList  A list of (ms, text) pairs.
+        @return overlays     A BoxOverlayInfo array.
+        """
+        # Fill the array straight from (ms, text) tuples, letting ctypes
+        # do the conversion rather than building each structure here...
+        key = tuple((ms, text) for ms, text in overlayList)
+        cachedKey, overlays = getattr(self, cacheAttr)
+        if key != cachedKey:
+            overlays = (BoxOverlayInfo*len(key))(*key)
+            setattr(self, cacheAttr, (key, overlays))
+
+        return overlays
 
 
     ###########################################################
     def close(self):
         """Close the currently opened clip"""
-        if self._clip:
-            _lib.free_clip_stream(byref(self._clip))
+        if self._clipFreer is not None:
+            self._clipFreer.free()
 
         self._clip = None
+        self._clipFreer = None
         self._width = 0
         self._height = 0
+        self._filenameUtf8 = None
 
 
     ###########################################################
@@ -412,13 +753,7 @@ class FfMpegClipReader(object):
         if not self._clip:
             return []
 
-        msListPtr = _lib.get_ms_list(self._clip)
-        if msListPtr:
-            msList = [msListPtr[i] for i in xrange(1, msListPtr[0]+1)]
-            _lib.free_ms_list(byref(msListPtr))
-            return msList
-        else:
-            return []
+        return _takeMsList(_lib.get_ms_list(self._clip))
 
 
     ###########################################################
@@ -431,15 +766,87 @@ class FfMpegClipReader(object):
         if not self._clip:
             return None
 
-        result = _lib.get_next_frame(self._clip)
+        result = _getNextFrame(self._clip)
         if not result:
             return None
 
-        clipFrame = FfMpegClipFrame(result, self._width, self._height)
+        clipFrame = FfMpegClipFrame(result, self._width, self._height,
+                                    self._pixFmt)
 
         return clipFrame
 
 
+    ###########################################################
+    def getNextFrames(self, count):
+        """Get up to the next count frames in the current clip.
+
+        This only crosses into the library once, so it's cheaper than calling
+        getNextFrame() count times.
+
+        @param  count   The maximum number of frames to get.
+        @return frames  A list of FfMpegClipFrames; shorter than count on
+                        error or when all frames have been read.
+        """
+        if not self._clip or count <= 0:
+            return []
+
+        if self._framePtrs is None or len(self._framePtrs) < count:
+            self._framePtrs = (POINTER(FfMpegClipFrameStruct) * count)()
+        framePtrs = self._framePtrs
+
+        numFrames = _getNextFrames(self._clip, count, framePtrs, None)
+
+        # Indexing the array gives pointers that live inside of it, so we make
+        # a standalone copy of each; the frames own (and will free) them...
+        structPtrType = POINTER(FfMpegClipFrameStruct)
+        width, height, pixFmt = self._width, self._height, self._pixFmt
+        return [FfMpegClipFrame(structPtrType(framePtrs[i].contents),
+                                width, height, pixFmt)
+                for i in range(numFrames)]
+
+
+    ###########################################################
+    def iterFrames(self, startMs=None, endMs=None, reuse=True):
+        """Iterate over frames of the current clip.
+
+        With reuse, a single FfMpegClipFrame is rebound to each new frame
+        rather than making a new one per frame.  That means the frame (and
+        what asPil() etc. return) is only good until the next step; numpy
+        views from asNumpy(copy=False) stay valid, since they reference the
+        old frame's memory.
+
+        @param  startMs  If not None, seek to the frame nearest this first;
+                         otherwise we start at the next frame.
+        @param  endMs    If not None, stop after frames at this offset.
+        @param  reuse    If False, yield a new FfMpegClipFrame each time.
+        @return frames   An iterator of FfMpegClipFrames.
+        """
+        if not self._clip:
+            return
+
+        if startMs is not None:
+            result = _getFrameAt(self._clip, int(startMs))
+        else:
+            result = _getNextFrame(self._clip)
+
+        clipFrame = None
+        while result:
+            if reuse and clipFrame is not None:
+                clipFrame.bind(result, self._width, self._height)
+            else:
+                clipFrame = FfMpegClipFrame(result, self._width, self._height,
+                                            self._pixFmt)
+
+            if endMs is not None and clipFrame.ms > endMs:
+                return
+
+            yield clipFrame
+
+            if not self._clip:
+                return
+            result = _getNextFrame(self._clip)
+
+
     ###########################################################
     def getPrevFrame(self):
         """Get the previous frame in the current clip
@@ -450,11 +857,12 @@ class FfMpegClipReader(object):
         if not self._clip:
             return None
 
-        result = _lib.get_prev_frame(self._clip)
+        result = _getPrevFrame(self._clip)
         if not result:
             return None
 
-        clipFrame = FfMpegClipFrame(result, self._width, self._height)
+        clipFrame = FfMpegClipFrame(result, self._width, self._height,
+                                    self._pixFmt)
 
         return clipFrame
 
@@ -480,7 +888,7 @@ class FfMpegClipReader(object):
         if not self._clip:
             return -1
 
-        return _lib.get_next_frame_offset(self._clip)
+        return _getNextFrameOffset(self._clip)
 
 
     ###########################################################
@@ -507,11 +915,41 @@ class FfMpegClipReader(object):
         if not self._clip:
             return None
 
-        result = _lib.get_frame_at(self._clip, int(msOffset))
+        result = _getFrameAt(self._clip, int(msOffset))
         if not result:
             return None
 
-        return FfMpegClipFrame(result, self._width, self._height)
+        return FfMpegClipFrame(result, self._width, self._height,
+                               self._pixFmt)
+
+
+    ###########################################################
+    def getFramesAt(self, msOffsets):
+        """Retrieve the frames closest to each of the given offsets.
+
+        This is one call into the library, which visits the offsets in sorted
+        order and decodes forward between nearby ones rather than seeking for
+        each.  The same caveat about mixing with getNextFrame() applies.
+
+        @param  msOffsets  A list of millisecond offsets, in any order.
+        @return frames     A list of FfMpegClipFrames (or None on error), in
+                           the same order as msOffsets.
+        """
+        count = len(msOffsets)
+        if not self._clip or not count:
+            return [None] * count
+
+        framePtrs = (POINTER(FfMpegClipFrameStruct) * count)()
+        _getFramesAtBatch(self._clip,
+                          (c_longlong * count)(*[int(ms) for ms in msOffsets]),
+                          count, framePtrs)
+
+        # As in getNextFrames(), each frame gets a standalone pointer...
+        structPtrType = POINTER(FfMpegClipFrameStruct)
+        width, height, pixFmt = self._width, self._height, self._pixFmt
+        return [FfMpegClipFrame(structPtrType(ptr.contents),
+                                width, height, pixFmt) if ptr else None
+                for ptr in framePtrs]
 
 
     ###########################################################
@@ -519,9 +957,10 @@ class FfMpegClipReader(object):
         """Set the size retrieved frames shoudl be.
 
         @param  resolution  The resolution new frames should be returned at."""
-        _lib.set_output_size(self._clip, resolution[0], resolution[1])
-        self._width = _lib.get_output_width(self._clip)
-        self._height = _lib.get_output_height(self._clip)
+        _lib.set_output_size2(self._clip, resolution[0], resolution[1],
+                              self._outWidthRef, self._outHeightRef)
+        self._width = self._outWidth.value
+        self._height = self._outHeight.value
 
         return self._width, self._height
 
@@ -40,16 +40,18 @@ Contains an interface to the c videolib module.
 
 
 from ctypes import CFUNCTYPE, POINTER, Structure, c_int, c_float, c_void_p
-from ctypes import c_longlong, c_char_p, string_at, byref
-import ConfigParser
+from ctypes import c_longlong, c_char_p, c_ubyte, string_at, byref
+import errno
 import os
-import shutil
-import sys
-import urlparse
 import traceback
 import threading
 import time
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
 from vitaToolbox.loggingUtils.LoggingUtils import kLogLevelError, kLogLevelInfo
 from vitaToolbox.loggingUtils.LoggingUtils import getStderrLogCB
 from vitaToolbox.ctypesUtils.PtrFreer import PtrFreer, withByref
@@ -59,7 +61,6 @@ from vitaToolbox.strUtils.EnsureUnicode import ensureUtf8, ensureUnicode
 from vitaToolbox.strUtils.EnsureUnicode import simplifyString
 from vitaToolbox.ctypesUtils.LoadLibrary import LoadLibrary
 from vitaToolbox.profiling.StatItem import StatItem
-from vitaToolbox.profiling.MarkTime import TimerLogger
 
 from videoLib2.python.VideoLibUtils import SetVideoLibDataPath
 
@@ -83,6 +84,12 @@ kCodecDefaults = {
 }
 kSectionVideo = "video"
 
+# Initial size of the buffer live preview JPEGs are encoded into...
+_kInitialJpegBufSize = 1 << 20
+
+# The (mtime, CodecConfig) from each codec config file we've read...
+_codecConfigCache = {}
+
 kPacketCaptureErrCodes = {
     -1:"Insufficient priveledges!!",
     -2:"Driver is not installed or inactive!!",
@@ -109,6 +116,14 @@ class StreamFrameStruct(Structure):
                 ("isRunning", c_int)]
 
 
+##############################################################################
+class StreamStateStruct(Structure):
+    """The stream state returned by the c library."""
+    _fields_ = [("procWidth", c_int),
+                ("procHeight", c_int),
+                ("isRunning", c_int)]
+
+
 ##############################################################################
 class CodecConfig(Structure):
     """The codec configuration passed to the c library."""
@@ -150,6 +165,9 @@ _videolib.get_number_of_supported_resolutions_of_local_camera.argtypes = [c_int]
 _videolib.get_number_of_supported_resolutions_of_local_camera.restype = c_int
 _videolib.get_supported_resolution_pair_of_device.argtypes = [c_int, c_int]
 _videolib.get_supported_resolution_pair_of_device.restype = POINTER(DimensionsStruct)
+_videolib.get_supported_resolutions_of_local_camera.argtypes = [c_int,
+                                            POINTER(DimensionsStruct), c_int]
+_videolib.get_supported_resolutions_of_local_camera.restype = c_int
 _videolib.get_fps_info.argtypes = [c_void_p, POINTER(c_float), POINTER(c_float)]
 _videolib.get_proc_width.argtypes = [c_void_p]
 _videolib.get_proc_width.restype = c_int
@@ -159,6 +177,8 @@ _videolib.open_mmap.argtypes = [c_void_p, c_char_p]
 _videolib.open_mmap.restype = c_int
 _videolib.is_running.argtypes = [c_void_p]
 _videolib.is_running.restype = c_int
+_videolib.videolib_get_state.argtypes = [c_void_p, POINTER(StreamStateStruct)]
+_videolib.videolib_get_state.restype = None
 _videolib.close_mmap.argtypes = [c_void_p]
 _videolib.set_mmap_params.argtypes = [c_void_p, c_int, c_int, c_int, c_int]
 _videolib.set_audio_volume.argtypes = [c_void_p, c_int]
@@ -171,6 +191,10 @@ _videolib.get_newest_frame_as_jpeg.argtypes = [c_void_p, c_int, c_int,
                                                POINTER(c_int)]
 _videolib.get_newest_frame_as_jpeg.restype = c_void_p
 _videolib.free_newest_frame.argtypes = [c_void_p]
+_videolib.get_newest_frame_as_jpeg_into.argtypes = [c_void_p, c_int, c_int,
+                                                    POINTER(c_ubyte), c_int,
+                                                    POINTER(c_int)]
+_videolib.get_newest_frame_as_jpeg_into.restype = c_int
 _videolib.get_initial_frame_buffer_size.argtypes = [c_void_p]
 _videolib.get_initial_frame_buffer_size.restype = c_int
 _videolib.move_recorded_file.argtypes = [LOGFUNC, c_char_p, c_char_p]
@@ -180,6 +204,19 @@ _videolib.videolib_get_hw_devices.restype = c_int
 _videolib.videolib_set_hw_device.argtypes = [ c_char_p ]
 _videolib.videolib_set_hw_device.restype = c_int
 
+# The freer we attach to every frame struct; it's the same for all of them...
+_freeFrameData = withByref(_videolib.free_frame_data)
+
+# The per-frame calls, looked up once rather than off of _videolib every time...
+_getNewFrame = _videolib.get_new_frame
+_isRunning = _videolib.is_running
+_getState = _videolib.videolib_get_state
+_flushOutput = _videolib.flush_output
+_getLargeFrame = _videolib.get_large_frame
+_getFpsInfo = _videolib.get_fps_info
+_getNewestFrameAsJpegInto = _videolib.get_newest_frame_as_jpeg_into
+_openMmap = _videolib.open_mmap
+_closeMmap = _videolib.close_mmap
 
 
 _k_oifWantTCP              = 0x0001
@@ -196,12 +233,20 @@ _k_oifFastStart            = 0x0400
 _k_oifRecordInMemory       = 0x0800
 _k_oifSimulation           = 0x1000
 
+# How many openAsync() calls may be connecting to cameras at once...
+_kMaxConcurrentOpens = 16
+_openSemaphore = threading.BoundedSemaphore(_kMaxConcurrentOpens)
+
 SetVideoLibDataPath()
 
 
 ##############################################################################
 class StreamFrame(object):
     """A class for accessing video frames."""
+    # We make one of these per frame per camera, so skip the __dict__...
+    __slots__ = ('structPtr', 'buffer', 'width', 'height', 'wasResized', 'ms',
+                 'filename', 'dummy', '__weakref__')
+
     ###########################################################
     def __init__(self, structPtr):
         """StreamFrame constructor.
@@ -210,31 +255,65 @@ class StreamFrame(object):
         """
         # Add a freer to the structure so that when there are no more
         # references to it, it will be freed automatically...
-        structPtr.__freer = PtrFreer(structPtr,
-                                     withByref(_videolib.free_frame_data))
+        structPtr.__freer = PtrFreer(structPtr, _freeFrameData)
 
         # Save the struct parameters; made public so that convertClipFrameToIpl
         # can add references to it...
         self.structPtr = structPtr
 
-        # Make the pointer contents accessible
-        self.buffer = c_void_p(self.structPtr.contents.procBuffer)
-        self.width = self.structPtr.contents.procWidth
-        self.height = self.structPtr.contents.procHeight
-        self.wasResized = self.structPtr.contents.wasResized > 0
-        self.ms = self.structPtr.contents.ms
-        self.filename = self.structPtr.contents.filename
-        self.dummy = self.structPtr.contents.procBuffer is None
+        # Make the pointer contents accessible; each trip through .contents
+        # builds a new Structure, so only take it once...
+        contents = structPtr.contents
+        procBuffer = contents.procBuffer
+        self.buffer = c_void_p(procBuffer)
+        self.width = contents.procWidth
+        self.height = contents.procHeight
+        self.wasResized = contents.wasResized > 0
+        self.ms = contents.ms
+        self.filename = contents.filename
+        self.dummy = procBuffer is None
 
         # Add a direct reference to the structPtr.  That way memory will be
         # alive as long as this pointer is alive...
         self.buffer.__refToStructPtr = structPtr
 
+    ###########################################################
+    def getPixelBuffer(self):
+        """Return the memory holding our (packed, 24-bit) pixels.
+
+        @return buffer  A ctypes array over the pixels, or None for a dummy
+                        frame; it keeps the frame data alive.
+        """
+        if self.dummy:
+            return None
+
+        buf = (c_ubyte * (self.width * self.height * 3)).from_address(
+                self.buffer.value)
+        buf.__refToStructPtr = self.structPtr
+        return buf
+
+    ###########################################################
+    def asNumpy(self):
+        """Return a read-only numpy view of our pixels, without copying.
+
+        @return img  A height x width x 3 array of uint8, or None for a dummy
+                     frame.
+        """
+        buf = self.getPixelBuffer()
+        if buf is None:
+            return None
+
+        import numpy
+        img = numpy.frombuffer(buf, numpy.uint8).reshape(self.height,
+                                                         self.width, 3)
+        img.flags.writeable = False
+        return img
+
     ###########################################################
     """ Procure non-resized frame which this object is based on, if available
     """
     def getLargeFrame(self):
-        result = _videolib.get_large_frame(self.structPtr)
+        result = _getLargeFrame(self.structPtr)
         if result:
             return StreamFrame(result)
         return None
@@ -242,6 +321,23 @@ class StreamFrame(object):
 ##############################################################################
 class StreamReader(object):
     """A class for accessing video streams."""
+    # Every attribute is read at frame rate by someone, so skip the __dict__...
+    __slots__ = ('locationName', 'isRunning', '_stream', '_clipDirPrefix',
+                 '_clipManager', '_record', '_baseFlags', '_recordDir',
+                 '_recordDirUtf8', '_storageDir', '_configDir',
+                 '_recordInMemory', '_logFn', '_initFrameBufferSize',
+                 '_moveFailedFn', '_cachedProcSize', '_jpegLock', '_jpegBuf',
+                 '_jpegSize', '_jpegSizeRef', '_mmapFilename',
+                 '_mmapFilenameUtf8', '_requestFps', '_captureFps',
+                 '_requestFpsRef', '_captureFpsRef', '_state', '_stateRef',
+                 '_createdFolders',
+                 '_statsInterval', '_nextStatsTime', '_timeToMoveClipStat',
+                 '_timeToAddClipStat', '_timeToGetFrameStat', '_moverWorker',
+                 '_moverJob', '_prevFilename', '_prevDirPath', '_curFilePath',
+                 '_curFilename', '_curDirPath', '_curStartMs', '_curLastMs',
+                 '_isMmapLargeView', '_mmapViewWidth', '_mmapViewHeight',
+                 '_mmapViewFps', '_canFlush', '__weakref__')
+
     ###########################################################
     def __init__(self, name='', clipManager=None, clipManagerLock=None, recordDir=u'.',
                  storageDir=u'.', configDir=u'.', logFn=None, record=True,
@@ -270,14 +366,20 @@ class StreamReader(object):
 
         # Save parameters
         self.locationName = name
+
+        # Clips are stored in <location>/<first 5 chars of the filename>...
+        self._clipDirPrefix = os.path.join(name, '').lower()
         self._clipManager = clipManager
         self._record=record
 
+        # Flags that don't depend on the extras passed to open()...
+        self._baseFlags = _k_oifShouldRecord if record else 0
 
         recordDir = ensureUnicode(recordDir)
         storageDir = ensureUnicode(storageDir)
 
         self._recordDir = abspathU(os.path.join(recordDir, name))+os.sep
+        self._recordDirUtf8 = ensureUtf8(self._recordDir)
         self._storageDir = abspathU(storageDir)+os.sep
         self._configDir = abspathU(configDir)
         self._recordInMemory = False
@@ -288,8 +390,30 @@ class StreamReader(object):
         self._moveFailedFn = moveFailedCallback
         self._cachedProcSize = (0,0)
 
+        # Reusable output buffer for getNewestFrameAsJpeg(), grown as needed;
+        # guarded by a lock since previews may be requested from any thread...
+        self._jpegLock = threading.Lock()
+        self._jpegBuf = (c_ubyte * _kInitialJpegBufSize)()
+        self._jpegSize = c_int()
+        self._jpegSizeRef = byref(self._jpegSize)
+
+        # The last mmap filename we were given, and its UTF-8 form...
+        self._mmapFilename = None
+        self._mmapFilenameUtf8 = None
+
+        # Out-parameter cells for getFpsInfo(), filled in place each call...
+        self._requestFps = c_float()
+        self._captureFps = c_float()
+        self._requestFpsRef = byref(self._requestFps)
+        self._captureFpsRef = byref(self._captureFps)
+
+        # Filled in by videolib_get_state()...
+        self._state = StreamStateStruct()
+        self._stateRef = byref(self._state)
+
         self._statsInterval = statsInterval
-        self._lastStatsTime = time.time()
+        # When to next log the timing stats...
+        self._nextStatsTime = time.time() + statsInterval
         self._timeToMoveClipStat = StatItem("timeToMoveClip", None, "%.1f", "%.1f")
         self._timeToMoveClipStat.setLimit((0,0.2))
         self._timeToAddClipStat  = StatItem("timeToAddClip", None, "%.1f", "%.1f")
@@ -297,13 +421,20 @@ class StreamReader(object):
         self._timeToGetFrameStat = StatItem("timeToGetFrame", None, "%.1f", "%.1f")
         self._timeToGetFrameStat.setLimit((0,0.2))
 
-        self._moverThread = None
+        # Clips are moved on a single, long-lived thread (started when first
+        # needed); _moverJob is the most recent move handed to it...
+        self._moverWorker = None
+        self._moverJob = None
 
         try:
             os.makedirs(self._recordDir)
         except Exception:
             pass
 
+        # Storage folders we know exist, so the mover needn't check each time;
+        # only touched by the mover thread...
+        self._createdFolders = set()
+
         self._initVariables()
 
 
@@ -318,6 +449,8 @@ class StreamReader(object):
         """Set variables to their initial state"""
         self._stream = None
         self.isRunning = False
+        # True while we've got an open, running stream; i.e. flush() may flush...
+        self._canFlush = False
         self._prevFilename = ''
         self._prevDirPath = ''
         self._curFilePath = ''
@@ -386,26 +519,35 @@ class StreamReader(object):
         """
         # We won't ever do anything to "device:" URLs.  NOTE: In actuality,
         # we don't need this check (the code below will be benign for all
-        # valid "device:" URLs that I can think of), but it seems wise since
-        # I'm not sure the behavior for urlsplit() is guaranteed for unknown URL
-        # schemes.
-        if not url.startswith("device:"):
-            # Split the URL using normal mechanisms...
-            scheme, netloc, path, query, fragment = urlparse.urlsplit(url)
-
-            # We only do our magic if HTTP and there is auth info...
-            if (scheme in ('http', 'https')) and ('@' in netloc):
-                # Split on the first '@'.  Note that if the user/password have
-                # '@' characters in them, they should have been escaped out.
-                authPart, hostPart = netloc.split('@', 1)
-
-                # If there is no password (signified by no ':'), add a ':' to
-                # the auth part let FFMPEG know it should use a blank password.
-                # ...then, recreate the full location.
-                if authPart and (':' not in authPart):
-                    netloc = '%s:@%s' % (authPart, hostPart)
-                    url = urlparse.urlunsplit((scheme, netloc, path,
-                                               query, fragment))
+        # valid "device:" URLs that I can think of), but it seems wise.
+        if url.startswith("device:"):
+            return url
+
+        # We only do our magic if HTTP and there is auth info.  We just scan
+        # the string for this rather than doing a full urlsplit()...
+        schemeEnd = url.find('://')
+        if schemeEnd < 0:
+            return url
+        scheme = url[:schemeEnd].lower()
+        if scheme not in ('http', 'https'):
+            return url
+
+        # The location runs up to the path, query or fragment...
+        netlocStart = schemeEnd + 3
+        netlocEnd = len(url)
+        for delim in '/?#':
+            delimPos = url.find(delim, netlocStart, netlocEnd)
+            if delimPos >= 0:
+                netlocEnd = delimPos
+
+        # Split on the first '@'.  Note that if the user/password have '@'
+        # characters in them, they should have been escaped out.
+        atPos = url.find('@', netlocStart, netlocEnd)
+
+        # If there is no password (signified by no ':'), add a ':' to the auth
+        # part let FFMPEG know it should use a blank password.
+        if atPos > netlocStart and url.find(':', netlocStart, atPos) < 0:
+            url = scheme + url[schemeEnd:atPos] + ':' + url[atPos:]
 
         return url
 
@@ -444,50 +586,73 @@ class StreamReader(object):
         if self._stream:
             self.close()
 
-        flags = 0
-
         decoderDevice = extras.get(kHardwareAccelerationDevice,'')
         if len(decoderDevice):
             _videolib.videolib_set_hw_device(ensureUtf8(decoderDevice))
 
-        if self._record:
-            flags |= _k_oifShouldRecord
-
         width, height = extras.get('recordSize', (320, 240))
         fps = extras.get('fpsLimit', 10)
 
-        if extras.get('forceTCP', False):
-            flags |= _k_oifWantTCP
-        if extras.get('recordAudio', True) == False:
-            flags |= _k_oifDisableAudio
-        if extras.get(kLiveEnableFastStart, kLiveEnableFastStartDefault):
-            flags |= _k_oifFastStart
-        if extras.get('simulation', 0) > 0:
-            flags |= _k_oifSimulation
         self._recordInMemory = extras.get(kRecordInMemory, kRecordInMemoryDefault)
-        if self._recordInMemory:
-            flags |= _k_oifRecordInMemory
-
+        flags = (self._baseFlags |
+            (_k_oifWantTCP if extras.get('forceTCP', False) else 0) |
+            (_k_oifDisableAudio if extras.get('recordAudio', True) == False else 0) |
+            (_k_oifFastStart if extras.get(kLiveEnableFastStart,
+                                           kLiveEnableFastStartDefault) else 0) |
+            (_k_oifSimulation if extras.get('simulation', 0) > 0 else 0) |
+            (_k_oifRecordInMemory if self._recordInMemory else 0) |
+            (_k_oifEnableTimestamp if extras.get('addTimestamps', False) else 0))
 
         path = self._avoidBlankPasswordBug(path)
         path, sanitizedPath = processUrlAuth(path)
 
-        if extras.get('addTimestamps', False):
-            flags |= _k_oifEnableTimestamp
-
         self._stream = c_void_p(_videolib.open_stream(ensureUtf8(path),
             ensureUtf8(sanitizedPath), width, height, fps,
-            ensureUtf8(self._recordDir),
+            self._recordDirUtf8,
             getCodecConfig(self._configDir),
             self._initFrameBufferSize, flags, self._logFn))
         if self._stream:
             self.isRunning = True
+            self._canFlush = True
             _videolib.set_mmap_params(self._stream, self._isMmapLargeView,
                 self._mmapViewWidth, self._mmapViewHeight, self._mmapViewFps)
 
         return self.isRunning
 
 
+    ###########################################################
+    def openAsync(self, path, extras={}, doneCallback=None):
+        """Open a video stream for reading on a background thread.
+
+        Connecting to a camera (an RTSP handshake, say) can take seconds; this
+        lets many streams connect at the same time.  Don't otherwise use this
+        object until the returned thread is done.
+
+        @param  path          Path to the stream to open
+        @param  extras        A dictionary containing optional configuration
+                              values, as for open()
+        @param  doneCallback  If not None, called from the background thread
+                              with the result of open() once it's done
+        @return thread        The (started) thread doing the open
+        """
+        def openThread():
+            success = False
+            try:
+                with _openSemaphore:
+                    success = self.open(path, extras)
+            except Exception:
+                self._logFn(kLogLevelError, "Failed to open stream: " +
+                            traceback.format_exc())
+            if doneCallback is not None:
+                doneCallback(success)
+
+        thread = threading.Thread(target=openThread,
+                                  name="open-%s" % self.locationName)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+
     ###########################################################
     def getProcSize(self):
         """Return the processing size being used for the current stream.
@@ -497,10 +662,9 @@ class StreamReader(object):
         @return  procSize  Processing size as a 2-tuple, (width, height)
         """
         if self.isRunning and self._stream:
-            self._cachedProcSize = (
-                _videolib.get_proc_width(self._stream),
-                _videolib.get_proc_height(self._stream)
-            )
+            _getState(self._stream, self._stateRef)
+            self._cachedProcSize = (self._state.procWidth,
+                                    self._state.procHeight)
 
         return self._cachedProcSize
 
@@ -522,6 +686,7 @@ class StreamReader(object):
         # We're no longer running; need to do this after the flush, else the
         # flush won't do anything...
         self.isRunning = False
+        self._canFlush = False
 
         if self._stream:
             _videolib.free_stream_data(byref(self._stream))
@@ -539,14 +704,52 @@ class StreamReader(object):
 
 
     ###########################################################
-    class ThreadedFileMover(threading.Thread):
-        ''' Internal class for offloading large(ish) files copying to a separate
+    class _MoverWorker(threading.Thread):
+        ''' Internal class that runs ThreadedFileMover jobs one at a time, so
+            that we don't start a new thread for every clip.
+        '''
+        def __init__(self, locationName):
+            threading.Thread.__init__(self, name="mover-%s" % locationName)
+            self.daemon = True
+            self._jobs = queue.Queue()
+            self.start()
+
+        ###########################################################
+        def submit(self, job):
+            self._jobs.put(job)
+
+        ###########################################################
+        def shutdown(self):
+            ''' Finish the queued jobs, then stop the thread '''
+            self._jobs.put(None)
+            self.join()
+
+        ###########################################################
+        def run(self):
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                try:
+                    job.run()
+                except Exception:
+                    job._logFn(kLogLevelError, "Failed to move clip: " +
+                               traceback.format_exc())
+                finally:
+                    job.done.set()
+
+
+    ###########################################################
+    class ThreadedFileMover(object):
+        ''' Internal class for offloading large(ish) files copying to the mover
             thread, so to not delay incoming stream processing.
         '''
         def __init__(self, owner):
-            threading.Thread.__init__(self)
             self._owner = owner
 
+            # set by the mover thread once run() is through...
+            self.done = threading.Event()
+
             # copy everything accessed in run() from the owner
 
             # these things may change while the thread is executing, so we must keep a copy
@@ -560,12 +763,14 @@ class StreamReader(object):
             self._curStartMs  = owner._curStartMs
             self._curLastMs   = owner._curLastMs
             self._recordInMemory = owner._recordInMemory
+            self._createdFolders = owner._createdFolders
 
             # these things should remain the same in the owner, but we'll still keep a pointer
             self._clipManager = owner._clipManager
             self._logFn       = owner._logFn
             self._moveFailedFn= owner._moveFailedFn
             self.locationName = owner.locationName
+            self._statsEnabled = owner._statsInterval > 0
             self._timeToMoveClipStat = owner._timeToMoveClipStat
             self._timeToAddClipStat  = owner._timeToAddClipStat
 
@@ -576,13 +781,18 @@ class StreamReader(object):
             if not self._curFilename or not self._clipManager:
                 return
 
-            timer = TimerLogger("moveFile")
+            if self._statsEnabled:
+                startTime = time.time()
             targetFolder = os.path.join(self._storageDir, self._curDirPath)
-            try:
-                if not os.path.isdir(targetFolder):
+            if targetFolder not in self._createdFolders:
+                try:
                     os.makedirs(targetFolder)
-            except Exception, e:
-                self._logFn(kLogLevelError, "Failed to create folder " + ensureUtf8(targetFolder) + ": " + str(e))
+                    self._createdFolders.add(targetFolder)
+                except OSError as e:
+                    if e.errno == errno.EEXIST:
+                        self._createdFolders.add(targetFolder)
+                    else:
+                        self._logFn(kLogLevelError, "Failed to create folder " + ensureUtf8(targetFolder) + ": " + str(e))
 
             src = os.path.join(self._recordDir, self._curFilename)
             dst = os.path.join(targetFolder, self._curFilename.lower())
@@ -593,16 +803,32 @@ class StreamReader(object):
                 else:
                     # Even if we've failed to create a folder, we try to move the file,
                     # so a `moveFailed' callback is triggered
-                    shutil.move(src, dst)
-            except Exception, e:
+                    self._moveFile(src, dst)
+            except Exception as e:
                 self._logFn(kLogLevelError, "Failed to move file (" + ensureUtf8(src) + "->" + ensureUtf8(dst) + "): " + str(e))
+                # ...in case the folder was removed out from under us
+                self._createdFolders.discard(targetFolder)
                 self._moveFailedFn(os.path.join(self._curDirPath,
                                                 self._curFilename))
-            self._timeToMoveClipStat.report(timer.diff_sec())
+            if self._statsEnabled:
+                self._timeToMoveClipStat.report(time.time() - startTime)
+
+        ###########################################################
+        def _moveFile(self, src, dst):
+            try:
+                os.rename(src, dst)
+            except OSError as e:
+                # Recording and storage on different filesystems, or the
+                # target exists on Windows; let shutil copy it over...
+                if e.errno not in (errno.EXDEV, errno.EEXIST):
+                    raise
+                import shutil
+                shutil.move(src, dst)
 
         ###########################################################
         def addFileToDb(self):
-            timer = TimerLogger("addFile")
+            if self._statsEnabled:
+                startTime = time.time()
             prevFile = ''
             if self._prevFilename:
                 prevFile = os.path.join(self._prevDirPath, self._prevFilename)
@@ -614,37 +840,43 @@ class StreamReader(object):
                                     self._curLastMs, prevFile, "", 1,
                                     size[0],
                                     size[1])
-            self._timeToAddClipStat.report(timer.diff_sec())
+            if self._statsEnabled:
+                self._timeToAddClipStat.report(time.time() - startTime)
 
     ###########################################################
     def _terminateMoverThread(self):
         self._finalizeMoverThread(True)
+        if self._moverWorker is not None:
+            self._moverWorker.shutdown()
+            self._moverWorker = None
 
     ###########################################################
     def _finalizeMoverThread(self, blockIfRunning):
-        if self._moverThread is not None:
-            if self._moverThread.isAlive():
+        if self._moverJob is not None:
+            if not self._moverJob.done.is_set():
                 if not blockIfRunning:
                     # The thread hasn't finished copying the file yet; let it run
                     return
 
                 # Definitely not normal, we expect 2 min files, and copying should not take this long
                 self._logFn(kLogLevelInfo, "Blocking copy operation, since previous one is outstanding ...")
-                self._moverThread.join()
+                self._moverJob.done.wait()
                 self._logFn(kLogLevelInfo, "... done")
-            self._moverThread.addFileToDb()
-            self._moverThread = None
+            self._moverJob.addFileToDb()
+            self._moverJob = None
 
     ###########################################################
     def _addFileToDb(self):
         """Move a clip to a perm location and add it to the database."""
         if not self._curFilename or not self._clipManager:
             return
-        # ensure a previously started mover thread completes, and the new file
+        # ensure a previously started move completes, and the new file
         # is added to database, before commencing
-        self._terminateMoverThread()
-        self._moverThread = self.ThreadedFileMover(self)
-        self._moverThread.start()
+        self._finalizeMoverThread(True)
+        if self._moverWorker is None:
+            self._moverWorker = self._MoverWorker(self.locationName)
+        self._moverJob = self.ThreadedFileMover(self)
+        self._moverWorker.submit(self._moverJob)
 
     ###########################################################
     def getNewFrame(self, isLive=False):
@@ -658,13 +890,21 @@ class StreamReader(object):
         if not self._stream or not self.isRunning:
             return None
 
-        timer = TimerLogger("getFrame")
-        result = _videolib.get_new_frame(self._stream, isLive)
+        # Only time things if someone is going to see the stats...
+        statsEnabled = self._statsInterval > 0
+        if statsEnabled:
+            startTime = time.time()
+
+        result = _getNewFrame(self._stream, isLive)
         if not result:
-            isRunning = _videolib.is_running(self._stream)
+            isRunning = _isRunning(self._stream)
         else:
-            isRunning = result.contents.isRunning
-        self._timeToGetFrameStat.report(timer.diff_sec())
+            contents = result.contents
+            isRunning = contents.isRunning
+
+        if statsEnabled:
+            now = time.time()
+            self._timeToGetFrameStat.report(now - startTime)
 
         if isRunning == 0:
             # If the stream just stopped unexpectedly, close ourselves (which
@@ -677,28 +917,30 @@ class StreamReader(object):
         if not result:
             return None
 
-        if self._clipManager and result.contents.filename != self._curFilePath:
-            self._curFilePath = result.contents.filename
+        if self._clipManager and contents.filename != self._curFilePath:
+            self._curFilePath = contents.filename
             self._addFileToDb()
             self._prevFilename = self._curFilename
             self._prevDirPath = self._curDirPath
-            self._curFilename = os.path.split(self._curFilePath)[1]
-            self._curDirPath = os.path.join(self.locationName,
-                                            self._curFilename[:5]).lower()
-            self._curStartMs = result.contents.ms
+            sepPos = max(self._curFilePath.rfind('/'),
+                         self._curFilePath.rfind(os.sep))
+            self._curFilename = self._curFilePath[sepPos+1:]
+            self._curDirPath = self._clipDirPrefix + \
+                               self._curFilename[:5].lower()
+            self._curStartMs = contents.ms
 
-        self._curLastMs = result.contents.ms
+        self._curLastMs = contents.ms
 
         # check if the mover thread had finished, and finalize/add to db if so
         self._finalizeMoverThread(False)
 
-        if self._statsInterval > 0 and \
-           self._lastStatsTime + self._statsInterval <= time.time():
-           self._lastStatsTime = time.time()
-           self._logFn(kLogLevelInfo, "TimingStats: %s %s %s" % (
-                       self._timeToGetFrameStat.reset(),
-                       self._timeToMoveClipStat.reset(),
-                       self._timeToAddClipStat.reset() ) )
+        # We already read the clock to time the frame, so reuse that...
+        if statsEnabled and now >= self._nextStatsTime:
+            self._nextStatsTime = now + self._statsInterval
+            self._logFn(kLogLevelInfo, "TimingStats: %s %s %s" % (
+                        self._timeToGetFrameStat.reset(),
+                        self._timeToMoveClipStat.reset(),
+                        self._timeToAddClipStat.reset() ) )
 
         return StreamFrame(result)
 
@@ -724,13 +966,9 @@ class StreamReader(object):
         @return captureFps  The average # of times per second that a new frame
                             came in from the camera.
         """
-        requestFps = c_float()
-        captureFps = c_float()
+        _getFpsInfo(self._stream, self._requestFpsRef, self._captureFpsRef)
 
-        _videolib.get_fps_info(self._stream,
-                               byref(requestFps), byref(captureFps))
-
-        return requestFps.value, captureFps.value
+        return self._requestFps.value, self._captureFps.value
 
 
     ###########################################################
@@ -741,10 +979,10 @@ class StreamReader(object):
                           is greater than the start of the clip being currently
                           recorded.
         """
-        if self._stream and self.isRunning and \
+        if self._canFlush and \
            ((msNeeded is None) or (msNeeded >= self._curStartMs)):
 
-            _videolib.flush_output(self._stream)
+            _flushOutput(self._stream)
 
 
     ###########################################################
@@ -755,8 +993,10 @@ class StreamReader(object):
                           is simply a shared memory name.
         """
         if self._stream:
-            return bool(_videolib.open_mmap(self._stream,
-                                            ensureUtf8(filename)))
+            if filename != self._mmapFilename:
+                self._mmapFilename = filename
+                self._mmapFilenameUtf8 = ensureUtf8(filename)
+            return bool(_openMmap(self._stream, self._mmapFilenameUtf8))
         return False
 
 
@@ -764,7 +1004,7 @@ class StreamReader(object):
     def close_mmap(self):
         """Close a previously opened memory map."""
         if self._stream:
-            _videolib.close_mmap(self._stream)
+            _closeMmap(self._stream)
 
 
     ###########################################################
@@ -820,25 +1060,62 @@ class StreamReader(object):
         @param height Height the JPEG should have.
         @return The JPEG data or None if no data is available.
         """
-        sizeOfJpeg = c_int()
-        jpeg = _videolib.get_newest_frame_as_jpeg(self._stream, width, height,
-                                                  byref(sizeOfJpeg))
-        if jpeg is None:
-            return None
-        result = string_at(jpeg, sizeOfJpeg.value)
-        _videolib.free_newest_frame(jpeg)
-        return result
+        with self._jpegLock:
+            size = self._encodeNewestFrame(width, height)
+            if size is None:
+                return None
+            return string_at(self._jpegBuf, size)
+
+    ###########################################################
+    def getNewestFrameAsJpegArray(self, width, height):
+        """Gets the very latest frame as a JPEG, without copying it.
+
+        The array is a read-only view of our JPEG buffer, so it's only valid
+        until the next getNewestFrameAsJpeg/getNewestFrameAsJpegArray call on
+        this StreamReader (from any thread); copy it if it needs to live longer.
+
+        @param width Width the JPEG should have.
+        @param height Height the JPEG should have.
+        @return A 1-D uint8 numpy array of the JPEG data, suitable for e.g.
+                cv2.imdecode(), or None if no data is available.
+        """
+        with self._jpegLock:
+            size = self._encodeNewestFrame(width, height)
+            if size is None:
+                return None
+            buf = self._jpegBuf
+
+        import numpy
+        jpeg = numpy.frombuffer(buf, numpy.uint8, size)
+        jpeg.flags.writeable = False
+        return jpeg
+
+    ###########################################################
+    def _encodeNewestFrame(self, width, height):
+        """Encode the latest frame into _jpegBuf; must hold _jpegLock.
+
+        @param width Width the JPEG should have.
+        @param height Height the JPEG should have.
+        @return size The size of the JPEG in _jpegBuf, or None on failure.
+        """
+        buf = self._jpegBuf
+        if _getNewestFrameAsJpegInto(self._stream, width,
+                height, buf, len(buf), self._jpegSizeRef) < 0:
+            if self._jpegSize.value <= len(buf):
+                return None
+            # Didn't fit; grow the buffer and encode again...
+            buf = self._jpegBuf = (c_ubyte * self._jpegSize.value)()
+            if _getNewestFrameAsJpegInto(self._stream, width,
+                    height, buf, len(buf), self._jpegSizeRef) < 0:
+                return None
+        return self._jpegSize.value
 
 ###########################################################
 def getHardwareDevicesList(logFn = None):
     maxLen = 32
     arr = (c_char_p * maxLen)()
     count = _videolib.videolib_get_hw_devices(arr, maxLen)
-    res = []
-    if count > 0:
-        for i in range(count):
-            res.append(arr[i])
-    return res
+    return list(arr[:count]) if count > 0 else []
 
 
 
@@ -878,47 +1155,36 @@ def getLocalCameraNames(logFn = None):
                                   "Exception info: %s" % traceback.format_exc())
             return cameraNames
 
-    for i in xrange(0, n):
+    for i in range(n):
 
         try:
-            name = ensureUnicode(str(_videolib.get_local_camera_name(i)))
+            name = _videolib.get_local_camera_name(i).decode('utf-8', 'replace')
         except:
             logFn(kLogLevelError, "Failed to get local camera name.")
             name = "Unknown Device %s" % str(i)
 
+        # A single guard for the whole probe; if any of it fails the camera is
+        # listed without resolutions, keeping list indices equal to device IDs...
+        resPairs = []
         try:
             numResPairs = _videolib.get_number_of_supported_resolutions_of_local_camera(i)
-        except:
-            logFn(kLogLevelError, "Failed to get number of supported resolutions "
-                                  "for this device: %s. Exception info: "
-                                  "%s" % (name, traceback.format_exc()))
-            numResPairs = 0
+            if numResPairs > 0:
+                # Fetch all of the device's resolutions in one call...
+                dims = (DimensionsStruct * numResPairs)()
+                count = _videolib.get_supported_resolutions_of_local_camera(
+                        i, dims, numResPairs)
+                if count < 0:
+                    raise ValueError("a resolution pair was unavailable")
+                # De-duplicate as (width << 16 | height) ints, which sort the
+                # same way as (width, height) tuples...
+                packed = set((d.width << 16) | d.height for d in dims[:count]
+                             if d.width >= 320 and d.height >= 240)
+                resPairs = [(v >> 16, v & 0xFFFF) for v in sorted(packed)]
+        except Exception as e:
+            logFn(kLogLevelError, "Failed to probe the supported resolutions "
+                                  "for this device: %s (%s)" % (name, str(e)))
+            resPairs = []
 
-        resPairs = []
-
-        for j in xrange(0, numResPairs):
-
-            try:
-                resPair = _videolib.get_supported_resolution_pair_of_device(i, j)
-            except:
-                logFn(kLogLevelError, "Failed to get the resolution pair for "
-                                      "this device: %s. Exception info: "
-                                      "%s" % (name, traceback.format_exc()))
-                resPairs = []
-                break
-
-            try:
-                if (resPair.contents.width >= 320) and (resPair.contents.height >= 240):
-                    resPairs.append( (resPair.contents.width, resPair.contents.height) )
-            except:
-                logFn(kLogLevelError, "Failed to access resolution pair values "
-                                      "in c-struct for this device: %s. "
-                                      "Exception info: "
-                                      "%s" % (name, traceback.format_exc()))
-                resPairs = []
-                break
-
-        resPairs = sorted(list(set(resPairs)))
         cameraNames.append( (name, resPairs) )
 
     return cameraNames
@@ -928,11 +1194,45 @@ def getLocalCameraNames(logFn = None):
 def getCodecConfig(configDir):
     """Returns the codec configuration data to use for video creation
 
+        The config file is only parsed again when it changes; each call gets
+        its own copy of the parsed values, so callers may modify it.
+
+        @param  configDir    Directory to search for the config file.
+        @return codecConfig  A CodecConfig object.
+    """
+    path = os.path.join(configDir, kCodecConfigFilename)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        # No config file; we'll use the defaults...
+        mtime = None
+
+    cached = _codecConfigCache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _loadCodecConfig(path))
+        _codecConfigCache[path] = cached
+
+    # Copy field by field, so the copy keeps its own reference to preset...
+    codecConfig = cached[1]
+    return CodecConfig(*[getattr(codecConfig, name)
+                         for name, _ in CodecConfig._fields_])
+
+
+###########################################################
+def _loadCodecConfig(path):
+    """Parse a codec config file.
+
+        @param  path         The config file; may not exist.
         @return codecConfig  A CodecConfig object.
     """
+    try:
+        import configparser as ConfigParser
+    except ImportError:
+        import ConfigParser
+
     codecConfig = CodecConfig()
     parser = ConfigParser.RawConfigParser(kCodecDefaults)
-    parser.read(os.path.join(configDir, kCodecConfigFilename))
+    parser.read(path)
 
     if not parser.has_section(kSectionVideo):
         parser.add_section(kSectionVideo)
@@ -958,7 +1258,8 @@ def test_main():
 
 ##############################################################################
 if __name__ == '__main__':
+    import sys
     if len(sys.argv) > 1 and sys.argv[1] == "test":
         test_main()
     else:
-        print "Try calling with 'test' as the argument."
+        print("Try calling with 'test' as the argument.")
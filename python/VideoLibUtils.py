@@ -70,6 +70,16 @@ if hasattr(sys, 'frozen'):
 
 _videoLib = LoadLibrary(None, 'videolib')
 
+_videoLib.videolib_set_path.argtypes = [c_int, c_char_p]
+_videoLib.get_module_names.argtypes = []
+_videoLib.get_module_names.restype = POINTER(c_char_p)
+_videoLib.set_module_trace_level.argtypes = [c_char_p, c_int]
+_videoLib.set_module_trace_levels.argtypes = [POINTER(c_char_p), POINTER(c_int),
+                                              c_int]
+_videoLib.set_all_modules_trace_level.argtypes = [c_int]
+_videoLib.ffmpeg_log_pause.argtypes = []
+_videoLib.ffmpeg_log_resume.argtypes = []
+
 
 # Defined in sv_os.h
 _kDataPath = 0
@@ -94,7 +104,6 @@ def SetVideoLibDataPath(dataPath=_dataDir):
     """
 
     if dataPath is not None:
-        _videoLib.videolib_set_path.argtypes = [c_int, c_char_p]
         _videoLib.videolib_set_path(_kDataPath, dataPath)
 
 ##############################################################################
@@ -127,14 +136,10 @@ def GetVideoLibLogLevels():
 
 ##############################################################################
 def GetVideolibModulesList():
-    _videoLib.get_module_names.argtypes = []
-    _videoLib.get_module_names.restype = POINTER(c_char_p)
-
     reslist = []
     index = 0
     modules = _videoLib.get_module_names()
     while modules[index] != None:
-        print modules[index]
         reslist.append(modules[index])
         index = index+1
 
@@ -142,15 +147,13 @@ def GetVideolibModulesList():
 
 ##############################################################################
 def SetVideoLibDebugConfig(dict):
-    _videoLib.set_module_trace_level.argtypes = [c_char_p, c_int]
-    _videoLib.ffmpeg_log_pause.argtypes = []
-    _videoLib.ffmpeg_log_resume.argtypes = []
-
     logLevel = _kLogLevelInfo
     logCount = -1
     logSize  = -1
 
     enableAllTracing = False
+    traceModules = []
+    traceLevels = []
 
     for key in dict:
         val = dict.get(key, '')
@@ -168,12 +171,15 @@ def SetVideoLibDebugConfig(dict):
         elif key in (_kLogLevelInfo, _kLogLevelError, _kLogLevelWarning, _kLogLevelDebug) and val:
             logLevel = key
         elif key != '' and not enableAllTracing:
-            level = 100 if val else 0
-            _videoLib.set_module_trace_level(key, level)
+            traceModules.append(key)
+            traceLevels.append(100 if val else 0)
 
     if enableAllTracing:
-        for item in GetVideolibModulesList():
-            _videoLib.set_module_trace_level(item, 100)
+        _videoLib.set_all_modules_trace_level(100)
+    elif traceModules:
+        count = len(traceModules)
+        _videoLib.set_module_trace_levels((c_char_p * count)(*traceModules),
+                                          (c_int * count)(*traceLevels), count)
 
     setLogParams(logLevel, logSize, logCount)
 
@@ -56,12 +56,14 @@ class FFmpegLog(object):
 
         self._lib = LoadLibrary(None, libName)
         logFunc = ctypes.CFUNCTYPE(None, ctypes.c_int, ctypes.c_char_p)
-        self._lib.ffmpeg_log_open.argtypes = [logFunc, ctypes.c_int]
-        self._lib.ffmpeg_log_open.restype = ctypes.c_int
+        self._lib.ffmpeg_log_open2.argtypes = [logFunc, ctypes.c_int,
+                                               ctypes.c_char_p]
+        self._lib.ffmpeg_log_open2.restype = ctypes.c_int
         self._lib.ffmpeg_log_close.argtypes = []
         self._lib.ffmpeg_log_pause.argtypes = []
         self._lib.ffmpeg_log_resume.argtypes = []
         self._lib.ffmpeg_log_close.restype = ctypes.c_int
+        self._logFunc = logFunc
         self._prefix = prefix
         self._cLogFun = None
 
@@ -77,11 +79,9 @@ class FFmpegLog(object):
         @param  bufLen  Maximum number of messages to buffer. Each up to 1K.
         @return         Zero on success, error code otherwise.
         """
-        def _prefixer(level, msg, *args, **kwargs):
-            logFn(level, self._prefix + msg, *args, **kwargs)
-        LOGFUNC = ctypes.CFUNCTYPE(None, ctypes.c_int, ctypes.c_char_p)
-        self._cLogFun = LOGFUNC(_prefixer)
-        return self._lib.ffmpeg_log_open(self._cLogFun, bufLen)
+        # The library puts the prefix in front of each message itself...
+        self._cLogFun = self._logFunc(logFn)
+        return self._lib.ffmpeg_log_open2(self._cLogFun, bufLen, self._prefix)
 
 
     ##########################################################
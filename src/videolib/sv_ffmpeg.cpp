@@ -50,6 +50,8 @@ extern "C" {
 
 static log_fn_t   _ffmpegLogFn = NULL;
 static int        _ffmpegLogEnabled = 0;
+static char       _ffmpegLogPrefix[64] = "";
+static size_t     _ffmpegLogPrefixLen = 0;
 static sv_mutex* gInitMutex = sv_mutex_create();
 static int       gInitCounter = 0;
 
@@ -68,6 +70,30 @@ static LogSpam gSpam[] = {
     { "No JPEG data found in image", 0, 0, 0 }
 };
 
+// Like log_impl(), but puts the prefix given to ffmpeg_log_open2() in front
+// of the message, so the log callback doesn't have to ...
+static void _ffmpeg_log_impl(int lvl, const char* fmt, va_list args)
+{
+    if (_ffmpegLogPrefixLen == 0 || _ffmpegLogFn == NULL) {
+        log_impl(_ffmpegLogFn, lvl, fmt, args);
+        return;
+    }
+
+    char buffer[2048];
+    memcpy(buffer, _ffmpegLogPrefix, _ffmpegLogPrefixLen);
+    vsnprintf(buffer + _ffmpegLogPrefixLen, sizeof(buffer) - _ffmpegLogPrefixLen,
+              fmt, args);
+    _ffmpegLogFn(lvl, buffer);
+}
+
+static void _ffmpeg_log_msg(int lvl, const char* fmt, ...)
+{
+    va_list args;
+    va_start(args, fmt);
+    _ffmpeg_log_impl(lvl, fmt, args);
+    va_end(args);
+}
+
 static int _filter_message(int lvl, const char* msg, va_list args)
 {
     int res = 1;
@@ -83,9 +109,9 @@ static int _filter_message(int lvl, const char* msg, va_list args)
             if ( timeDiff > gSpamInterval ) {
                 // yup, enough time had passed
                 if ( item.count > 0 ) {
-                    log_msg(_ffmpegLogFn, lvl, _FMT("The following message occurred " << item.count << " times in the last " << timeDiff/1000 << " seconds"));
+                    _ffmpeg_log_msg(lvl, "%s", _FMT("The following message occurred " << item.count << " times in the last " << timeDiff/1000 << " seconds"));
                 }
-                log_impl(_ffmpegLogFn, lvl, msg, args);
+                _ffmpeg_log_impl(lvl, msg, args);
                 item.lastLogged = currentTime;
                 item.count = 0;
             } else {
@@ -122,7 +148,7 @@ static void _ffmpeg_log_cb(void* avc, int lvl, const char* fmt, va_list args)
             !_filter_message(lvl, fmt, args) ) {
         return;
     }
-    log_impl(_ffmpegLogFn, lvl, fmt, args);
+    _ffmpeg_log_impl(lvl, fmt, args);
 }
 
 SVVIDEOLIB_API
@@ -139,10 +165,13 @@ int  ffmpeg_log_resume()
     return 0;
 }
 
+// Same as ffmpeg_log_open(), but every message passed to logFn starts with
+// the given prefix (which may be NULL) ...
 SVVIDEOLIB_API
-int ffmpeg_log_open(log_fn_t logFn, int logBufSize)
+int ffmpeg_log_open2(log_fn_t logFn, int logBufSize, const char* prefix)
 {
     char* env;
+    int   logLevel = av_log_get_level();
 
     // NOTE: always overwrite the old buffer, since we might originate from
     //       parent process which itself already opened logging. Replacing is
@@ -156,7 +185,6 @@ int ffmpeg_log_open(log_fn_t logFn, int logBufSize)
 
     env = getenv("SV_LOG_LEVEL_FFMPEG");
     if (env) {
-        int logLevel;
         if (1 == sscanf(env, "%d", &logLevel)) {
             switch(logLevel) {
             case kLogLevelDebug   : logLevel = AV_LOG_DEBUG  ; break;
@@ -168,15 +196,25 @@ int ffmpeg_log_open(log_fn_t logFn, int logBufSize)
             }
             av_log_set_level(logLevel);
         }
-        log_info(logFn, "FFmpeg log level set to %d (%s)", logLevel, env);
     }
-    av_log_set_callback(_ffmpeg_log_cb);
+    snprintf(_ffmpegLogPrefix, sizeof(_ffmpegLogPrefix), "%s", prefix ? prefix : "");
+    _ffmpegLogPrefixLen = strlen(_ffmpegLogPrefix);
     _ffmpegLogFn = logFn;
-    log_info(logFn, "FFmpeg logging active");
+    if (env) {
+        _ffmpeg_log_msg(kLogLevelInfo, "FFmpeg log level set to %d (%s)", logLevel, env);
+    }
+    av_log_set_callback(_ffmpeg_log_cb);
+    _ffmpeg_log_msg(kLogLevelInfo, "FFmpeg logging active");
 
     return 0;
 }
 
+SVVIDEOLIB_API
+int ffmpeg_log_open(log_fn_t logFn, int logBufSize)
+{
+    return ffmpeg_log_open2(logFn, logBufSize, NULL);
+}
+
 
 
 SVVIDEOLIB_API
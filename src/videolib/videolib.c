@@ -205,6 +205,27 @@ void set_module_trace_level(const char* module, int level)
     }
 }
 
+// Sets the trace level of several modules in one call
+void set_module_trace_levels(const char** modules, const int* levels, int count)
+{
+    int nI;
+
+    for (nI=0; nI<count; nI++) {
+        set_module_trace_level(modules[nI], levels[nI]);
+    }
+}
+
+// Sets the trace level of every module
+void set_all_modules_trace_level(int level)
+{
+    int nI=0;
+
+    while (gModuleNames[nI] != NULL) {
+        set_module_trace_level(gModuleNames[nI], level);
+        nI++;
+    }
+}
+
 
 static const int _kOne=1;
 static const int _kTwo=2;
@@ -972,6 +993,27 @@ SVVIDEOLIB_API int is_running(StreamData* data)
     return 0;
 }
 
+//-----------------------------------------------------------------------------
+typedef struct StreamState {
+    int procWidth;
+    int procHeight;
+    int isRunning;
+} StreamState;
+
+//-----------------------------------------------------------------------------
+// Return the processing size and running state in one call, rather than one
+// call for each.
+SVVIDEOLIB_API void videolib_get_state(StreamData* data, StreamState* state)
+{
+    if (data) {
+        state->procWidth = data->inputData2.width;
+        state->procHeight = data->inputData2.height;
+        state->isRunning = data->isRunning;
+    } else {
+        memset(state, 0, sizeof(StreamState));
+    }
+}
+
 //-----------------------------------------------------------------------------
 // Returns a FrameData* for the most recently obtained frame, or NULL if there
 // has been no new frame since the last call.
@@ -1911,6 +1953,14 @@ create_clip_cleanup:
     return realFirstMs;
 }
 
+//-----------------------------------------------------------------------------
+// A log_fn_t that writes straight to stderr. Used as the default logger by the
+// python bindings, so that log messages don't have to call back into python.
+SVVIDEOLIB_API void videolib_stderr_log(int level, const char* msg)
+{
+    fprintf(stderr, "%d: %s", level, msg);
+}
+
 //-----------------------------------------------------------------------------
 // Create a single clip from a one or more video files
 SVVIDEOLIB_API uint64_t create_clip(int numFiles,
@@ -1945,6 +1995,58 @@ SVVIDEOLIB_API uint64_t create_clip(int numFiles,
     return realFirstMs>=0 ? 0 : -1;
 }
 
+//-----------------------------------------------------------------------------
+// A single clip for create_clips(); mirrors the parameters of create_clip()
+typedef struct ClipRequest {
+    int                 numFiles;
+    const char**        filenames;
+    uint64_t*           fileOffsetMs;
+    uint64_t            firstMs;
+    uint64_t            lastMs;
+    const char*         outfile;
+    CodecConfig*        codecConfig;
+    int                 timestampFlags;
+    int                 numBoxes;
+    BoxOverlayInfo*     boxes;
+    const char*         format;
+    int                 fps;
+    // filled in by create_clips(): 0 on success, -1 on error
+    int                 result;
+} ClipRequest;
+
+//-----------------------------------------------------------------------------
+// Create a number of clips with a single call. The result of each is stored in
+// its request; returns the number of clips that failed.
+SVVIDEOLIB_API int create_clips(int numRequests,
+                ClipRequest* requests,
+                log_fn_t logFn,
+                progress_fn_t progCb)
+{
+    int i, failed = 0;
+
+    for ( i = 0; i < numRequests; i++ ) {
+        ClipRequest* req = &requests[i];
+        req->result = (int)create_clip(req->numFiles,
+                            req->filenames,
+                            req->fileOffsetMs,
+                            req->firstMs,
+                            req->lastMs,
+                            req->outfile,
+                            req->codecConfig,
+                            req->timestampFlags,
+                            req->numBoxes,
+                            req->boxes,
+                            req->format,
+                            req->fps,
+                            logFn,
+                            progCb );
+        if ( req->result != 0 ) {
+            failed++;
+        }
+    }
+    return failed;
+}
+
 //-----------------------------------------------------------------------------
 // Create a video clip from all or part of one or more exixting video clips.
 // Will return -1 on error, otherwise the actual ms offset of the first frame.
@@ -2039,6 +2141,31 @@ SVVIDEOLIB_API Dimensions* get_supported_resolution_pair_of_device(int deviceId,
 #endif
 }
 
+//-----------------------------------------------------------------------------
+// Copies up to maxCount supported resolutions of the given device into out,
+// so they can all be fetched in one call. Returns the number copied, or -1 if
+// a resolution couldn't be read.  You must call get_local_camera_count() first
+// and every time a device is added or removed.
+SVVIDEOLIB_API int get_supported_resolutions_of_local_camera(int deviceId,
+                                                Dimensions* out, int maxCount)
+{
+    int         i;
+    int         count = get_number_of_supported_resolutions_of_local_camera(deviceId);
+    Dimensions* dims;
+
+    if (count > maxCount) {
+        count = maxCount;
+    }
+    for (i = 0; i < count; i++) {
+        dims = get_supported_resolution_pair_of_device(deviceId, i);
+        if (!dims) {
+            return -1;
+        }
+        out[i] = *dims;
+    }
+    return count;
+}
+
 
 //-----------------------------------------------------------------------------
 static CodecConfig* copy_codec_config(CodecConfig* config) {
@@ -2085,8 +2212,12 @@ static void free_codec_config(CodecConfig** config)
 //       context and saving the scaling and buffer instances, but our current
 //       performance tests show that there seems to be no significant bottleneck
 //       right now ...
-SVVIDEOLIB_API void* get_newest_frame_as_jpeg(StreamData* data, int width, int height,
-                               int* size) {
+//
+// If outBuf is NULL the JPEG is returned in a buffer allocated with av_malloc,
+// otherwise it is written to outBuf; if it doesn't fit, NULL is returned and
+// the size needed is stored in *size ...
+static void* _newest_frame_as_jpeg(StreamData* data, int width, int height,
+                               uint8_t* outBuf, int outBufSize, int* size) {
     int                sz, err;
     frame_obj*         lastFrameRead = NULL;
     frame_api_t*       frameApi;
@@ -2251,12 +2382,19 @@ SVVIDEOLIB_API void* get_newest_frame_as_jpeg(StreamData* data, int width, int h
     }
 
     // extract the data from the packet, no need for another copy action
-    result = av_malloc(packet.size);
-    if (!result) {
-        goto get_newest_frame_as_jpeg_exit;
+    *size = packet.size;
+    if (outBuf) {
+        if (packet.size > outBufSize) {
+            goto get_newest_frame_as_jpeg_exit;
+        }
+        result = outBuf;
+    } else {
+        result = av_malloc(packet.size);
+        if (!result) {
+            goto get_newest_frame_as_jpeg_exit;
+        }
     }
     memcpy(result, packet.data, packet.size);
-    *size = packet.size;
 
 get_newest_frame_as_jpeg_exit:
     // cleanup, any "exception" also lands here...
@@ -2275,6 +2413,25 @@ get_newest_frame_as_jpeg_exit:
     return result;
 }
 
+//-----------------------------------------------------------------------------
+SVVIDEOLIB_API void* get_newest_frame_as_jpeg(StreamData* data, int width, int height,
+                               int* size) {
+    return _newest_frame_as_jpeg(data, width, height, NULL, 0, size);
+}
+
+//-----------------------------------------------------------------------------
+// Same as get_newest_frame_as_jpeg, but writes into a caller supplied buffer.
+// Returns 0 on success; -1 on failure, in which case *size is set to the size
+// needed if the buffer was too small, and to 0 otherwise.
+SVVIDEOLIB_API int get_newest_frame_as_jpeg_into(StreamData* data, int width,
+                               int height, uint8_t* buf, int bufSize, int* size) {
+    *size = 0;
+    if (!buf || bufSize <= 0) {
+        return -1;
+    }
+    return _newest_frame_as_jpeg(data, width, height, buf, bufSize, size) ? 0 : -1;
+}
+
 
 //-----------------------------------------------------------------------------
 SVVIDEOLIB_API void free_newest_frame(void* ptr)
@@ -2310,14 +2467,73 @@ SVVIDEOLIB_API int get_initial_frame_buffer_size(StreamData* data)
 #define CLIP_DBG(...) if ( _gClipDebugEnabled > 0 ) log_dbg (__VA_ARGS__)
 
 //-----------------------------------------------------------------------------
-// Attempts to open a clip to be read
-SVVIDEOLIB_API ClipStream* open_clip(const char* filename, int width, int height,
+// The pixel format names accepted by open_clip2, and our own format ids
+static const struct {
+    const char*     name;
+    int             pixFmt;
+} _kClipPixFmts[] = {
+    { "rgb24",      pfmtRGB24   },
+    { "bgr24",      pfmtBGR24   },
+    { "yuv420p",    pfmtYUV420P },
+    { "nv12",       pfmtNV12    },
+};
+
+//-----------------------------------------------------------------------------
+// Maps the pixel format names accepted by open_clip2 to our own format ids.
+// Returns pfmtUndefined for names we don't support.
+static int _clip_pixfmt_from_name(const char* name)
+{
+    size_t i;
+
+    if ( name == NULL || name[0] == '\0' ) {
+        return GET_FRAME_PIX_FMT;
+    }
+    for ( i = 0; i < sizeof(_kClipPixFmts)/sizeof(_kClipPixFmts[0]); i++ ) {
+        if ( !_stricmp(name, _kClipPixFmts[i].name) ) {
+            return _kClipPixFmts[i].pixFmt;
+        }
+    }
+    return pfmtUndefined;
+}
+
+//-----------------------------------------------------------------------------
+// The reverse of _clip_pixfmt_from_name; NULL for formats open_clip2 doesn't
+// accept by name.
+static const char* _clip_pixfmt_name(int pixFmt)
+{
+    size_t i;
+
+    for ( i = 0; i < sizeof(_kClipPixFmts)/sizeof(_kClipPixFmts[0]); i++ ) {
+        if ( _kClipPixFmts[i].pixFmt == pixFmt ) {
+            return _kClipPixFmts[i].name;
+        }
+    }
+    return NULL;
+}
+
+//-----------------------------------------------------------------------------
+// Attempts to open a clip to be read, returning frames in the given pixel
+// format ("rgb24", "bgr24", "yuv420p" or "nv12"; NULL for the default).
+// Overlays are drawn in the default format, so they force it.
+SVVIDEOLIB_API ClipStream* open_clip2(const char* filename, int width, int height,
                     uint64_t timestampOffset, int enableAudio, int enableThread,
                     int enableDebug, int timestampFlags, int keyframeOnly,
                     int numBoxes, BoxOverlayInfo* boxes,
                     int numRegions, BoxOverlayInfo* regions,
+                    const char* pixFmt,
                     log_fn_t logFn)
 {
+    int requestedPixFmt = _clip_pixfmt_from_name(pixFmt);
+    if ( requestedPixFmt == pfmtUndefined ) {
+        log_err(logFn, "Unsupported pixel format '%s' requested for %s", pixFmt, filename);
+        return NULL;
+    }
+    if ( requestedPixFmt != GET_FRAME_PIX_FMT &&
+         (timestampFlags || numBoxes > 0 || numRegions > 0) ) {
+        log_warn(logFn, "Overlays require the default pixel format; ignoring '%s' for %s", pixFmt, filename);
+        requestedPixFmt = GET_FRAME_PIX_FMT;
+    }
+
     ClipStream* stream = (ClipStream*)malloc(sizeof(ClipStream));
     stream->lastMsReturned = (int64_t)-1;
     stream->logFn = logFn;
@@ -2343,7 +2559,7 @@ SVVIDEOLIB_API ClipStream* open_clip(const char* filename, int width, int height
                     0,
                     width,
                     height,
-                    GET_FRAME_PIX_FMT,
+                    requestedPixFmt,
                     0,
                     0,
                     flags,
@@ -2388,6 +2604,20 @@ SVVIDEOLIB_API ClipStream* open_clip(const char* filename, int width, int height
     return stream;
 }
 
+//-----------------------------------------------------------------------------
+// Attempts to open a clip to be read
+SVVIDEOLIB_API ClipStream* open_clip(const char* filename, int width, int height,
+                    uint64_t timestampOffset, int enableAudio, int enableThread,
+                    int enableDebug, int timestampFlags, int keyframeOnly,
+                    int numBoxes, BoxOverlayInfo* boxes,
+                    int numRegions, BoxOverlayInfo* regions,
+                    log_fn_t logFn)
+{
+    return open_clip2(filename, width, height, timestampOffset, enableAudio,
+                    enableThread, enableDebug, timestampFlags, keyframeOnly,
+                    numBoxes, boxes, numRegions, regions, NULL, logFn);
+}
+
 //-----------------------------------------------------------------------------
 // Returns 1 if the clip has audio, and 0 otherwise
 SVVIDEOLIB_API int clip_has_audio(ClipStream* stream)
@@ -2667,6 +2897,28 @@ static void* get_frame_at_or_before(ClipStream* stream, INT64_T ms)
 
 }
 
+//-----------------------------------------------------------------------------
+// Retrieve up to 'count' next frames from a file with a single call. Frames are
+// stored in 'frames' and, if it isn't NULL, their ms offsets in 'ms'. Returns
+// the number of frames retrieved; fewer than 'count' means error or the end
+// of the clip.
+SVVIDEOLIB_API int get_next_frames(ClipStream* stream, int count,
+                ClipFrame** frames, int64_t* ms)
+{
+    int i;
+
+    for ( i = 0; i < count; i++ ) {
+        frames[i] = (ClipFrame*)get_next_frame(stream);
+        if ( frames[i] == NULL ) {
+            break;
+        }
+        if ( ms != NULL ) {
+            ms[i] = frames[i]->ms;
+        }
+    }
+    return i;
+}
+
 //-----------------------------------------------------------------------------
 // Retrieve the prev frame from a file. Returns a ClipFrame*, NULL on error
 // or when there are no more frames.
@@ -2718,6 +2970,114 @@ SVVIDEOLIB_API void* get_frame_at(ClipStream* stream, int64_t ms)
 }
 
 
+//-----------------------------------------------------------------------------
+// In get_frames_at_batch, we'll decode forward from one requested frame to the
+// next if they're at most this far apart; otherwise we'll seek.
+#define BATCH_DECODE_FORWARD_MS 1000
+
+typedef struct ClipBatchRequest {
+    int64_t ms;
+    int     index;
+} ClipBatchRequest;
+
+//-----------------------------------------------------------------------------
+static int compare_batch_requests(const void* a, const void* b)
+{
+    const ClipBatchRequest* reqA = (const ClipBatchRequest*)a;
+    const ClipBatchRequest* reqB = (const ClipBatchRequest*)b;
+
+    if ( reqA->ms != reqB->ms ) {
+        return reqA->ms < reqB->ms ? -1 : 1;
+    }
+    return reqA->index - reqB->index;
+}
+
+//-----------------------------------------------------------------------------
+// Make another ClipFrame referencing the same decoded frame, so that each
+// one can be freed independently.
+static ClipFrame* clone_clip_frame(ClipStream* stream, ClipFrame* src)
+{
+    frame_ref(src->frame);
+    return (ClipFrame*)create_frame(stream, src->frame);
+}
+
+//-----------------------------------------------------------------------------
+// Retrieve the frame closest to (at or before) each of 'count' ms offsets,
+// like calling get_frame_at for each. Offsets are visited in sorted order,
+// decoding forward between nearby ones rather than seeking for each.
+// frames[i] gets the frame for ms[i], or NULL if there is none; each must be
+// freed with free_clip_frame. Returns the number of frames found, -1 on error.
+SVVIDEOLIB_API int get_frames_at_batch(ClipStream* stream, const int64_t* ms,
+                int count, ClipFrame** frames)
+{
+    ClipBatchRequest*   requests;
+    ClipFrame*          cur = NULL;
+    ClipFrame*          next;
+    ClipFrame*          res;
+    int                 found = 0;
+    int                 i;
+
+    if ( !stream ) {
+        return -1;
+    }
+    if ( !stream->input.streamCtx ) {
+        log_err(stream->logFn, "no stream is currently open");
+        return -1;
+    }
+
+    if ( count <= 0 ) {
+        return 0;
+    }
+
+    requests = (ClipBatchRequest*)malloc(count*sizeof(ClipBatchRequest));
+    if ( requests == NULL ) {
+        log_err(stream->logFn, "failed to allocate %d batch requests", count);
+        return -1;
+    }
+    for ( i = 0; i < count; i++ ) {
+        requests[i].ms = ms[i];
+        requests[i].index = i;
+        frames[i] = NULL;
+    }
+    qsort(requests, count, sizeof(ClipBatchRequest), compare_batch_requests);
+
+    CLIP_DBG(stream->logFn, "ClipUtils-%p: Getting %d frames from ts="I64FMT" to "I64FMT,
+                        stream, count, requests[0].ms, requests[count-1].ms);
+
+    for ( i = 0; i < count; i++ ) {
+        int64_t target = requests[i].ms;
+
+        if ( cur != NULL && target - cur->ms <= BATCH_DECODE_FORWARD_MS ) {
+            // We're right behind it; read up to the last frame at or before
+            // the target...
+            res = NULL;
+            while ( get_next_frame_offset(stream) >= 0 &&
+                    stream->nextFrame->ms <= target ) {
+                next = (ClipFrame*)get_next_frame(stream);
+                free_clip_frame(&res);
+                res = next;
+            }
+            if ( res == NULL ) {
+                // ...nothing newer, so it's the same frame as last time
+                res = clone_clip_frame(stream, cur);
+            }
+        } else {
+            res = (ClipFrame*)get_frame_at_or_before(stream, target);
+        }
+
+        frames[requests[i].index] = res;
+        if ( res != NULL ) {
+            found++;
+        }
+        cur = res;
+    }
+
+    stream->lastMsReturned = cur ? cur->ms : -1;
+    free(requests);
+    return found;
+}
+
+
 //-----------------------------------------------------------------------------
 // Return an array of millisecond offsets for each frame in the clip.  The
 // first entry in the array is the number of frames.  Returns NULL on error.
@@ -2831,6 +3191,94 @@ int get_output_width(ClipStream* stream)
     return stream->outWidth;
 }
 
+//-----------------------------------------------------------------------------
+// Return the name of the pixel format retrieved frames are in. This is not
+// necessarily the one passed to open_clip2, since overlays force the default.
+SVVIDEOLIB_API const char* get_clip_pix_fmt(ClipStream* stream)
+{
+    if ( !stream ) {
+        return NULL;
+    }
+    return _clip_pixfmt_name(stream->input.pixFmt);
+}
+
+//-----------------------------------------------------------------------------
+// Return the name of the pixel format frames come in when open_clip2 isn't
+// asked for one
+SVVIDEOLIB_API const char* get_default_clip_pix_fmt()
+{
+    return _clip_pixfmt_name(GET_FRAME_PIX_FMT);
+}
+
+//-----------------------------------------------------------------------------
+// Describe how a frame of the given size and pixel format (named as for
+// open_clip2) is laid out in the buffer the frame getters return: for each
+// plane, its offset, its stride, the bytes of pixel data in each of its rows
+// and its number of rows. Frame buffers are filled in with _kDefAlign, so rows
+// may be padded. Returns the number of planes, or -1 on error.
+SVVIDEOLIB_API int get_frame_planes(const char* pixFmt, int width, int height,
+                    int* offsets, int* strides, int* rowBytes, int* rows,
+                    int maxPlanes)
+{
+    int                         svPixFmt = _clip_pixfmt_from_name(pixFmt);
+    enum AVPixelFormat          ffPixFmt;
+    const AVPixFmtDescriptor*   desc;
+    uint8_t*                    data[4];
+    int                         linesize[4];
+    int                         packedLinesize[4];
+    int                         numPlanes, i;
+
+    if ( svPixFmt == pfmtUndefined || !offsets || !strides || !rowBytes || !rows ) {
+        return -1;
+    }
+    ffPixFmt = svpfmt_to_ffpfmt(svPixFmt, NULL);
+    desc = av_pix_fmt_desc_get(ffPixFmt);
+    numPlanes = av_pix_fmt_count_planes(ffPixFmt);
+    if ( !desc || numPlanes <= 0 || numPlanes > maxPlanes ) {
+        return -1;
+    }
+
+    // Same layout ff_frame_get_buffer and ff_frame_get_data use; the base
+    // pointer doesn't matter, as we only want the offsets
+    if ( av_image_fill_arrays(data, linesize, NULL, ffPixFmt, width, height,
+                    _kDefAlign) < 0 ||
+         av_image_fill_linesizes(packedLinesize, ffPixFmt, width) < 0 ) {
+        return -1;
+    }
+
+    for ( i = 0; i < numPlanes; i++ ) {
+        offsets[i] = (int)(data[i] - data[0]);
+        strides[i] = linesize[i];
+        rowBytes[i] = packedLinesize[i];
+        rows[i] = ( i == 1 || i == 2 ) ?
+                    AV_CEIL_RSHIFT(height, desc->log2_chroma_h) : height;
+    }
+    return numPlanes;
+}
+
+//-----------------------------------------------------------------------------
+// Return both dimensions of retrieved frames in one call
+SVVIDEOLIB_API void get_output_size(ClipStream* stream, int* width, int* height)
+{
+    if (width)
+        *width = stream->outWidth;
+    if (height)
+        *height = stream->outHeight;
+}
+
+//-----------------------------------------------------------------------------
+// Same as set_output_size, but also returns the resulting output size, saving
+// callers a trip back for each dimension. 0 on success, -1 on error.
+SVVIDEOLIB_API int set_output_size2(ClipStream* stream, int width, int height,
+                    int* outWidth, int* outHeight)
+{
+    int res = set_output_size(stream, width, height);
+    if ( stream ) {
+        get_output_size(stream, outWidth, outHeight);
+    }
+    return res;
+}
+
 
 //-----------------------------------------------------------------------------
 // Return the height and with that the input file had